@@ -1,4 +1,7 @@
 from django.contrib import admin
-from .models import TarotCard
+from .models import TarotCard,DailyPanchang,Job,DailyHoroscope
 # Register your models here.
-admin.site.register(TarotCard)
\ No newline at end of file
+admin.site.register(TarotCard)
+admin.site.register(DailyPanchang)
+admin.site.register(Job)
+admin.site.register(DailyHoroscope)
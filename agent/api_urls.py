@@ -6,11 +6,17 @@ urlpatterns = [
     path('chat/', api_views.chat_api, name='api-chat'),
     path('compatibility/', api_views.compatibility_api, name='api-compatibility'),
     path('kundali/', api_views.kundali_api, name='api-kundali'),
+    path('kundali/chart/', api_views.kundali_chart_api, name='api-kundali-chart'),
     path('panchang/', api_views.panchang_api, name='api-panchang'),
+    path('panchang/range/', api_views.panchang_range_api, name='api-panchang-range'),
     path('kundali-matching/', api_views.kundali_matching_api, name='api-kundali-matching'),
+    path('kundali-matching/search/', api_views.kundali_matching_search_api, name='api-kundali-matching-search'),
+    path('kundali-matching/batch/', api_views.kundali_matching_batch_api, name='api-kundali-matching-batch'),
     path('bazi/', api_views.bazi_api, name='api-bazi'),
     path('create-profile/',api_views.create_profile_api,name="api-create-profile"),
     path('update-profile/',api_views.update_profile_api,name="api-update-profile"),
+    path('jobs/<int:job_id>/', api_views.job_status_api, name='api-job-status'),
+    path('metrics/transcription/', api_views.transcription_metrics_api, name='api-transcription-metrics'),
     path('horoscope/', api_views.horoscope_api, name='api-horoscope'),
     path('signup/', api_views.signup_api, name='api-signup'),
     path('login/', api_views.login_api, name='api-login'),
@@ -1,29 +1,40 @@
 # yourapp/api_views.py
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.response import Response
 from rest_framework import generics,status
 from django.contrib.auth.models import User
 from django.contrib.auth import login, authenticate
-from .models import UserProfile,TarotCard
+from django.http import HttpResponse,StreamingHttpResponse
+from .models import UserProfile,TarotCard,Job
 from .serializers import UserProfileSerializer,PanchangSerializer
 from datetime import date,datetime,timedelta
-import os,base64,io,random
+import os,base64,io,random,json,csv
 # from google.generativeai import GenerativeModel, configure
 # from dotenv import load_dotenv
-from .utils.kundali import get_kundali_chart
+from .utils.kundali import (get_kundali_chart,get_kundali_cached,kundali_chart_image,kundali_chart_urls,
+                            render_kundali_charts,CHART_MIME)
 from .utils.compatibility import compatibility_report
-from .utils.kundali_matching import perform_kundali_matching
-from .utils.chinese_zodiac import generate_bazi
-from .views import geocode_place_timezone
-from .utils.panchang import get_panchang
+from .utils.kundali_matching import perform_kundali_matching,moon_chart,SIGNS,NAKSHATRAS
+from .utils.matchmaking import search_matches,profile_moon_chart,DEFAULT_LIMIT
+from .utils.natal import get_natal_snapshot,natal_summary,own_kundali,offset_at
+from .utils.batch_matching import iter_batch_matching,pairs_from_csv,MAX_PAIRS
+from .utils.chinese_zodiac import generate_bazi,element_chart_url
+from .utils.geocoding import geocode_place_timezone
+from .utils.panchang_store import get_panchang_for_day,iter_panchang_range,MAX_RANGE_DAYS
 # from gtts import gTTS
-from faster_whisper import WhisperModel
+from .utils.whisper_models import get_whisper_model,CHAT_MODEL_SIZE
+from .utils.audio_io import load_audio
 from .utils.tarot import get_ai_interpretation,load_cards
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework_simplejwt.tokens import RefreshToken,AccessToken
 from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
-from openai import AzureOpenAI
+from .utils.llm import complete
+from .utils.sse import chat_stream_response,wants_stream
+from .utils.transcription import transcription_metrics
+from .utils.horoscope import get_daily_horoscope,normalize_sign,normalize_locale,horoscope_locales,DEFAULT_LOCALE
+from .utils.horoscope import SIGNS as ZODIAC_SIGNS
+from .utils.jobs import enqueue,job_payload,wants_async
 def get_permanent_token(user):
     token = AccessToken.for_user(user)
     # token.set_exp(lifetime=timedelta(days=365*100))  # 100 years
@@ -32,7 +43,6 @@ def get_permanent_token(user):
     return str(token)
 
 load_cards()
-whisperModel = WhisperModel("base")
 SYSTEM_PROMPT_TEMPLATE = (
    """Role & Tone:
 You are a compassionate, direct, and senior Vedic astrologer. Your role is to guide the user on life’s journey with clear, simple, and practical advice anyone can understand.
@@ -98,13 +108,6 @@ This astrology guidance system has been created and built by JMS Advisory, bring
 # configure(api_key=AI_API_KEY)
 # MODEL = GenerativeModel("gemini-2.5-flash")
 
-endpoint = os.getenv("ENDPOINT_URL", "https://jivihireopenai.openai.azure.com/")
-client = AzureOpenAI(
-        azure_endpoint=endpoint,
-        api_key=os.environ['OPENAI_API_KEY'],
-        api_version="2024-05-01-preview",
-    )
-    
 # ==================== Chat API ====================
 @csrf_exempt
 @api_view(['POST'])
@@ -116,8 +119,7 @@ def chat_api(request):
         is_voice = True
         audio_file = request.FILES['audio']
         # print(audio_file)
-        audio_content = audio_file.read()
-        segments, info = whisperModel.transcribe(io.BytesIO(audio_content))
+        segments, info = get_whisper_model(CHAT_MODEL_SIZE).transcribe(load_audio(audio_file))
         print(segments)
         try:
                 message = " ".join(seg.text.strip() for seg in segments)
@@ -141,6 +143,9 @@ def chat_api(request):
         today=date.today(),
         name=profile.name or request.user.username,
     )
+    snapshot = get_natal_snapshot(profile)
+    if snapshot:
+        system_prompt += "\n\nChart (precomputed):\n\n" + natal_summary(snapshot)
 
     chat_history = request.session.get("chat_history", [])
 
@@ -150,14 +155,11 @@ def chat_api(request):
     # Add user message
     chat_history.append({"role": "user", "content": message})
 
-    # Call OpenAI GPT model
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",  # or "gpt-4", "gpt-3.5-turbo"
-        messages=chat_history[-20:],  # last 20 messages
-        temperature=0.7
-    )
+    if wants_stream(request, request.data):
+        return chat_stream_response(request, chat_history, keep=20)
 
-    reply = response.choices[0].message.content.strip()
+    # Call OpenAI GPT model
+    reply = complete(chat_history[-20:])
 
     # Save in session
     chat_history.append({"role": "assistant", "content": reply})
@@ -185,25 +187,21 @@ def chat_api(request):
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def horoscope_api(request):
-    sign = request.data.get("sign", "").capitalize()
-
-    if not sign:
+    if not request.data.get("sign"):
         return Response({"error": "Please provide a zodiac sign."}, status=400)
+    sign = normalize_sign(request.data.get("sign"))
+    if not sign:
+        return Response({"error": f"Unknown zodiac sign. Use one of: {', '.join(ZODIAC_SIGNS)}."}, status=400)
+    locale = normalize_locale(request.data.get("locale") or DEFAULT_LOCALE)
+    if not locale:
+        return Response({"error": f"Unsupported locale. Use one of: {', '.join(horoscope_locales())}."}, status=400)
 
-    # Prompt for GPT
-    prompt = f"Give me today's horoscope for the zodiac sign {sign} in 3-4 sentences. Keep it positive and inspiring."
+    if wants_async(request, request.data):
+        job = enqueue("horoscope", {"sign": sign, "locale": locale}, request.user)
+        return Response(job_payload(job), status=202)
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are an expert astrologer who gives daily horoscopes."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7
-        )
-
-        horoscope = response.choices[0].message.content.strip()
+        horoscope = get_daily_horoscope(sign, locale)
 
         return Response({
             "sign": sign,
@@ -233,7 +231,7 @@ def panchang_api(request):
         offset_tz = float(now.utcoffset().total_seconds() / 3600)
         h = datetime.now().hour
         mi = datetime.now().minute
-        result = get_panchang(year, month, day, h,  mi, lat, lon, offset_tz)
+        result = get_panchang_for_day(date(year, month, day), h, mi, lat, lon, offset_tz)
 
         serializer = PanchangSerializer(result)
         return Response(serializer.data)
@@ -241,6 +239,37 @@ def panchang_api(request):
     except Exception as e:
         return Response({"error": str(e)}, status=400)
 
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def panchang_range_api(request):
+    """
+    Panchang for every day in [start, end] at one place, streamed as NDJSON
+    (one JSON object per line, with a "date" field). The place is geocoded
+    once; end defaults to start + 29 days.
+    """
+    try:
+        start = datetime.strptime(request.data.get('start') or date.today().isoformat(), "%Y-%m-%d").date()
+        if request.data.get('end'):
+            end = datetime.strptime(request.data.get('end'), "%Y-%m-%d").date()
+        else:
+            end = start + timedelta(days=29)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+    if end < start or (end - start).days >= MAX_RANGE_DAYS:
+        return Response({"error": f"end must be within {MAX_RANGE_DAYS} days after start"}, status=400)
+
+    place = request.data.get('place') or request.user.userprofile.birth_place
+    lat, lon, tz = geocode_place_timezone(place)
+    if lat is None:
+        return Response({"error": f"Could not resolve place '{place}'"}, status=400)
+
+    def lines():
+        for result in iter_panchang_range(start, end, lat, lon, tz):
+            row = dict(PanchangSerializer(result).data, date=result["date"])
+            yield json.dumps(row) + "\n"
+
+    return StreamingHttpResponse(lines(), content_type="application/x-ndjson")
+
 # ==================== Compatibility API ====================
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -249,32 +278,93 @@ def compatibility_api(request):
     person2 = request.data.get("person2")
     if not person1 or not person2:
         return Response({"error": "Missing persons"}, status=400)
+    if wants_async(request, request.data):
+        job = enqueue("compatibility", {"person1": person1, "person2": person2}, request.user)
+        return Response(job_payload(job), status=202)
     result = compatibility_report(person1, person2)
     return Response({"text": result})
 
 # ==================== Kundali API ====================
+def _kundali_args(data):
+    """get_kundali_chart() arguments from request data, or None if the place can't be geocoded."""
+    year = int(data['year'])
+    month = int(data['month'])
+    day = int(data['day'])
+    hour = int(data['hour'])
+    minute = int(data['minute'])
+    second = int(data['second'])
+    place = data['place']
+
+    lat, lon, tz = geocode_place_timezone(place)
+    if lat is None or tz is None:
+        return None
+    # Offset at the birth moment, as the profile snapshots use
+    offset_tz = offset_at(tz, datetime(year, month, day, hour, minute))
+    return year, month, day, hour, minute, lat, lon, offset_tz
+
+def _charts_mode(data):
+    """
+    "url" (default): content-addressed image URLs, served with strong ETags.
+    "inline": base64 images embedded in the JSON (the old behaviour).
+    "none"/false: no images at all.
+    """
+    mode = str(data.get('charts', 'url')).lower()
+    if mode in ('0', 'false', 'no', 'none'):
+        return 'none'
+    if mode in ('1', 'true', 'yes', 'inline'):
+        return 'inline'
+    return 'url'
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def kundali_api(request):
+    """
+    "charts" selects how the D1/D9 images come back (see _charts_mode); with
+    "none" they can be fetched on demand from kundali_chart_api. "format":
+    "svg" returns SVG images instead of PNG.
+    """
     try:
         data = request.data
-        year = int(data['year'])
-        month = int(data['month'])
-        day = int(data['day'])
-        hour = int(data['hour'])
-        minute = int(data['minute'])
-        second = int(data['second'])
-        place = data['place']
-
-        lat, lon, tz = geocode_place_timezone(place)
-        from datetime import datetime
-        now = datetime.now(tz)
-        offset_tz = float(now.utcoffset().total_seconds() / 3600)
-        result = get_kundali_chart(year, month, day, hour, minute, lat, lon, offset_tz)
+        mode = _charts_mode(data)
+        fmt = str(data.get('format', 'png')).lower()
+        if fmt not in CHART_MIME:
+            return Response({"error": "format must be png or svg"}, status=400)
+        result = own_kundali(getattr(request.user, 'userprofile', None), data['year'], data['month'],
+                             data['day'], data['hour'], data['minute'], data['place'])
+        if result is None:
+            args = _kundali_args(data)
+            if args is None:
+                return Response({"error": "Could not find that place"}, status=400)
+            result = get_kundali_chart(*args, render=False)
+        if mode == 'inline':
+            result = render_kundali_charts(result, fmt)
+        if mode == 'url':
+            result = kundali_chart_urls(result, fmt)
+            result["kundali_chart_url"] = request.build_absolute_uri(result["kundali_chart_url"])
+            result["navamsa_chart_url"] = request.build_absolute_uri(result["navamsa_chart_url"])
         return Response(result)
     except KeyError:
         return Response({"error": "Missing parameters"}, status=400)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def kundali_chart_api(request):
+    """Renders a single chart image ("chart": "d1" or "d9", "format": "png" or "svg")."""
+    which = str(request.data.get('chart', 'd1')).lower()
+    fmt = str(request.data.get('format', 'png')).lower()
+    if which not in ('d1', 'd9') or fmt not in CHART_MIME:
+        return Response({"error": "chart must be d1 or d9, format png or svg"}, status=400)
+    try:
+        args = _kundali_args(request.data)
+    except KeyError:
+        return Response({"error": "Missing parameters"}, status=400)
+    if args is None:
+        return Response({"error": "Could not find that place"}, status=400)
+    digest, content = kundali_chart_image(get_kundali_cached(*args), which, fmt)
+    response = HttpResponse(content, content_type=CHART_MIME[fmt])
+    response["ETag"] = f'"{digest}"'
+    return response
+
 # ==================== Kundali Matching API ====================
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -286,6 +376,70 @@ def kundali_matching_api(request):
     result = perform_kundali_matching(person1, person2)
     return Response(result)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def kundali_matching_batch_api(request):
+    """
+    Many pairs at once, streamed as NDJSON in input order.
+    JSON body {"pairs": [{"person1": {...}, "person2": {...}, "id": ...}]}
+    or a CSV upload in "file" (see utils.batch_matching.pairs_from_csv).
+    """
+    if 'file' in request.FILES:
+        try:
+            pairs = pairs_from_csv(request.FILES['file'].read().decode('utf-8-sig'))
+        except (UnicodeDecodeError, csv.Error) as e:
+            return Response({"error": f"Invalid CSV: {e}"}, status=400)
+    else:
+        pairs = request.data.get("pairs")
+    if not isinstance(pairs, list) or not pairs:
+        return Response({"error": "Missing pairs"}, status=400)
+    if len(pairs) > MAX_PAIRS:
+        return Response({"error": f"At most {MAX_PAIRS} pairs per batch"}, status=400)
+
+    def lines():
+        for row in iter_batch_matching(pairs):
+            yield json.dumps(row) + "\n"
+
+    return StreamingHttpResponse(lines(), content_type="application/x-ndjson")
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def kundali_matching_search_api(request):
+    """
+    Best Ashtakoota matches among stored profiles.
+    person: optional {Date, Time, Place}; defaults to the caller's profile.
+    gender, min_score, limit: optional filters (limit <= 100).
+    """
+    person = request.data.get("person")
+    profile = getattr(request.user, "userprofile", None)
+    try:
+        if person:
+            chart = moon_chart(person)
+        else:
+            chart = profile_moon_chart(profile) if profile else None
+            if chart is None:
+                return Response({"error": "Profile birth details are incomplete"}, status=400)
+        min_score = float(request.data.get("min_score", 0))
+        limit = int(request.data.get("limit", DEFAULT_LIMIT))
+    except (ValueError, KeyError) as e:
+        return Response({"error": str(e)}, status=400)
+
+    results = search_matches(
+        chart,
+        gender=request.data.get("gender"),
+        min_score=min_score,
+        limit=limit,
+        exclude_profile_id=profile.pk if profile else None,
+    )
+    return Response({
+        "seeker": {
+            "rashi": SIGNS[chart["rashi_index"]],
+            "nakshatra": NAKSHATRAS[chart["nakshatra_index"]],
+            "mars_house": chart["mars_house"],
+        },
+        "results": results,
+    })
+
 # ==================== Bazi API ====================
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -297,14 +451,19 @@ def bazi_api(request):
         day = int(data['day'])
         hour = int(data['hour'])
 
-        bazi, chart, day_master, master_info, element_percentages = generate_bazi(year, month, day, hour)
-        return Response({
+        mode = _charts_mode(data)
+        bazi, chart, day_master, master_info, element_percentages = generate_bazi(year, month, day, hour, render=(mode == 'inline'))
+        result = {
             "bazi": bazi,
-            "chart": chart,
             "day_master": day_master,
             "master_info": master_info,
             "element_percentages": element_percentages,
-        })
+        }
+        if mode == 'inline':
+            result["chart"] = chart
+        elif mode == 'url':
+            result["chart_url"] = request.build_absolute_uri(element_chart_url(element_percentages))
+        return Response(result)
     except KeyError:
         return Response({"error": "Missing parameters"}, status=400)
     
@@ -321,6 +480,9 @@ def draw_card(request):
         "meaning": card.meaning_reversed if reversed_state else card.meaning_upright,
         "image": card.image
     }
+    if wants_async(request):
+        job = enqueue("tarot", {"spread": [data], "spread_type": "single card"}, request.user)
+        return Response({"card": data, "job": job_payload(job)}, status=202)
     interpretation = get_ai_interpretation([data], spread_type="single card")
     return Response({
         "card": data,
@@ -343,12 +505,24 @@ def three_card_spread(request):
             "meaning": card.meaning_reversed if reversed_state else card.meaning_upright,
             "image": card.image
         })
+    if wants_async(request):
+        job = enqueue("tarot", {"spread": spread, "spread_type": "3-card"}, request.user)
+        return Response({"spread": spread, "job": job_payload(job)}, status=202)
     interpretation = get_ai_interpretation(spread, spread_type="3-card")
     return Response({
         "spread": spread,
         "interpretation": interpretation
     })
 
+# ==================== Jobs API ====================
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def job_status_api(request, job_id):
+    job = Job.objects.filter(pk=job_id, user=request.user).first()
+    if job is None:
+        return Response({"error": "Job not found"}, status=404)
+    return Response(job_payload(job))
+
 # ==================== User Profile API ====================
 class UserProfileAPI(generics.RetrieveUpdateAPIView):
     queryset = UserProfile.objects.all()
@@ -432,3 +606,10 @@ def logout_api(request):
         return Response({"success": True, "message": "Logged out successfully"})
     except Exception as e:
         return Response({"error": str(e)}, status=400)
+
+# ==================== Metrics API ====================
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def transcription_metrics_api(request):
+    """Voice transcription pool of this worker process: queue depth, rejections, latency (s)."""
+    return Response(transcription_metrics())
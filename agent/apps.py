@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AgentConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'agent'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -2,28 +2,21 @@
 import json, os, base64, asyncio
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from faster_whisper import WhisperModel
 # from gtts import gTTS
-from io import BytesIO
-from pydub import AudioSegment
 # from google.generativeai import GenerativeModel, configure
 from dotenv import load_dotenv
 from datetime import date
+from .utils.transcription import get_transcription_pool, TranscriptionBusy
+from .utils import whisper_models
+from .utils.speech import SpeechSegmenter
+from .utils.jobs import job_group
 
 load_dotenv()
 
-# Load Whisper once
-model = WhisperModel("small")  # tiny/small/medium/large
 # AI_API_KEY = os.getenv("AI_API_KEY")
 # configure(api_key=AI_API_KEY)
 # MODEL = GenerativeModel("gemini-2.5-flash")
-from openai import AzureOpenAI
-endpoint = os.getenv("ENDPOINT_URL", "https://jivihireopenai.openai.azure.com/")
-client = AzureOpenAI(
-        azure_endpoint=endpoint,
-        api_key=os.environ['OPENAI_API_KEY'],
-        api_version="2024-05-01-preview",
-    )
+from .utils.llm import astream_chat
 SYSTEM_PROMPT_TEMPLATE = (
     "You are Astro AI, a specialized assistant dedicated exclusively to astrology. "
     "Your role is to provide accurate, insightful, and engaging answers about horoscopes, "
@@ -40,14 +33,35 @@ SYSTEM_PROMPT_TEMPLATE = (
     "Reply like a kind, insightful astrologer."
 )
 
+# Completed utterances waiting for transcription per socket; more are refused
+MAX_QUEUED_UTTERANCES = 4
+
+def transcribe_samples(samples, partial=False):
+    """
+    16 kHz float32 samples -> text. Runs on the transcription pool; partials
+    use greedy decoding since they are replaced by the final transcript.
+    """
+    model = whisper_models.get_whisper_model(whisper_models.VOICE_MODEL_SIZE)
+    segments, _ = model.transcribe(samples, language="en", beam_size=1 if partial else 5,
+                                   condition_on_previous_text=False, without_timestamps=partial)
+    return " ".join(seg.text.strip() for seg in segments).strip()
+
 
 class VoiceConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         await self.accept()
         self.chat_history = []
+        self.segmenter = SpeechSegmenter()
+        self.utterances = asyncio.Queue(maxsize=MAX_QUEUED_UTTERANCES)
+        self.audio_task = None
+        self.partial_task = None
+        whisper_models.warm(whisper_models.VOICE_MODEL_SIZE)
         print("🔮 WebSocket connected")
 
     async def disconnect(self, close_code):
+        for task in (self.audio_task, self.partial_task):
+            if task:
+                task.cancel()
         print("❌ WebSocket disconnected")
 
     async def receive(self, text_data=None, bytes_data=None):
@@ -56,45 +70,83 @@ class VoiceConsumer(AsyncWebsocketConsumer):
             user_text = data.get("message")
             if user_text:
                 await self.handle_user_message(user_text)
+            if data.get("audio_end"):  # recording stopped: close the open utterance
+                self.handle_speech_events(self.segmenter.flush())
 
         elif bytes_data:  # audio bytes
-            asyncio.create_task(self.handle_audio_chunk(bytes_data))
-
-    async def handle_audio_chunk(self, bytes_data):
-        """Transcribe audio chunk & respond live"""
-        audio_file = BytesIO(bytes_data)
-        sound = AudioSegment.from_raw(audio_file, sample_width=2, frame_rate=48000, channels=1)
-        output = BytesIO()
-        sound.export(output, format="wav")
-        output.seek(0)
-
-        # Whisper partial transcription
-        result, _ = model.transcribe(output, language="en")
-        text = " ".join([seg.text for seg in result]).strip()
+            self.enqueue_audio(bytes_data)
+
+    def enqueue_audio(self, bytes_data):
+        """Feed a PCM frame to the socket's segmenter and act on what it reports."""
+        self.handle_speech_events(self.segmenter.feed(bytes_data))
+
+    def handle_speech_events(self, events):
+        for kind, audio in events:
+            if kind == "final":
+                # A late partial must not overwrite the final transcript
+                if self.partial_task:
+                    self.partial_task.cancel()
+                try:
+                    self.utterances.put_nowait(audio)
+                except asyncio.QueueFull:
+                    asyncio.create_task(self.send(json.dumps({"error": "Transcription is busy, please try again."})))
+                    continue
+                if self.audio_task is None or self.audio_task.done():
+                    self.audio_task = asyncio.create_task(self.drain_audio())
+            # One partial in flight per socket, and none while finals wait
+            elif self.utterances.empty() and (self.partial_task is None or self.partial_task.done()):
+                self.partial_task = asyncio.create_task(self.send_partial(audio))
+
+    async def drain_audio(self):
+        while not self.utterances.empty():
+            await self.handle_audio_chunk(self.utterances.get_nowait())
+
+    async def send_partial(self, audio):
+        try:
+            text = await get_transcription_pool().run(transcribe_samples, audio, True)
+        except TranscriptionBusy:
+            return
+        if text:
+            await self.send(json.dumps({"partial_transcript": text}))
+
+    async def handle_audio_chunk(self, audio):
+        """Transcribe a completed utterance & respond live"""
+        try:
+            text = await get_transcription_pool().run(transcribe_samples, audio)
+        except TranscriptionBusy:
+            await self.send(json.dumps({"error": "Transcription is busy, please try again."}))
+            return
         if text:
             await self.send(json.dumps({"transcript": text}))
             await self.handle_user_message(text)
 
     async def handle_user_message(self, user_text):
         reply_stream = await self.get_ai_reply(user_text)
+        if reply_stream is None:
+            return
 
         sentence_buffer = ""
-        async for piece in reply_stream:
-            if not piece.strip():
-                continue
-
-            # Send partial reply text
-            await self.send(json.dumps({"partial_reply": piece}))
-            sentence_buffer += piece
-
-            # If sentence ends, TTS immediately
-            if sentence_buffer.endswith((".", "!", "?")):
-                audio_base64 = await asyncio.to_thread(self.get_tts_audio, sentence_buffer)
-                await self.send(json.dumps({"audio_chunk": audio_base64}))
-                sentence_buffer = ""
+        try:
+            async for piece in reply_stream:
+                sentence_buffer += piece
+                if not piece.strip():
+                    continue
+
+                # Send partial reply text
+                await self.send(json.dumps({"partial_reply": piece}))
+
+                # If sentence ends, TTS immediately
+                if sentence_buffer.rstrip().endswith((".", "!", "?")):
+                    audio_base64 = await asyncio.to_thread(self.get_tts_audio, sentence_buffer)
+                    await self.send(json.dumps({"audio_chunk": audio_base64}))
+                    sentence_buffer = ""
+        except Exception as e:
+            print(f"AI reply failed: {e}")
+            await self.send(json.dumps({"error": "Unable to process request."}))
+            return
 
         # Flush remainder
-        if sentence_buffer:
+        if sentence_buffer.strip():
             audio_base64 = await asyncio.to_thread(self.get_tts_audio, sentence_buffer)
             await self.send(json.dumps({"audio_chunk": audio_base64}))
 
@@ -102,12 +154,12 @@ class VoiceConsumer(AsyncWebsocketConsumer):
         user = self.scope["user"]
         if not user.is_authenticated:
             await self.close()
-            return []
+            return None
 
         profile = await database_sync_to_async(lambda: getattr(user, "userprofile", None))()
         if not profile:
             await self.send(json.dumps({"error": "User profile not found"}))
-            return []
+            return None
 
         system_prompt = SYSTEM_PROMPT_TEMPLATE.format(
             birth_date=profile.birth_date,
@@ -119,27 +171,19 @@ class VoiceConsumer(AsyncWebsocketConsumer):
         )
 
         if not self.chat_history:
-            self.chat_history = [{"role": "model", "parts": [{"text": system_prompt}]}]
+            self.chat_history = [{"role": "system", "content": system_prompt}]
 
-        self.chat_history.append({"role": "user", "parts": [{"text": user_text}]})
-
-        # chat = MODEL.start_chat(history=self.chat_history)
-        # response = chat.send_message(user_text, stream=True)
-        response = client.chat.completions.create(
-            model="gpt-4o-mini", 
-            messages=self.chat_history[-20:],  
-            temperature=0.7
-        )
-        # reply = response.choices[0].message.content.strip()
+        self.chat_history.append({"role": "user", "content": user_text})
+        # Keep the system prompt plus the 19 most recent turns
+        messages = self.chat_history[:1] + self.chat_history[1:][-19:]
 
         async def generator():
             reply_accum = ""
-            for chunk in response:
-                if chunk.text:
-                    reply_accum += chunk.text
-                    yield chunk.text
-            self.chat_history.append({"role": "model", "parts": [{"text": reply_accum}]})
-            self.chat_history = self.chat_history[-20:]
+            async for delta in astream_chat(messages):
+                reply_accum += delta
+                yield delta
+            self.chat_history.append({"role": "assistant", "content": reply_accum.strip()})
+            self.chat_history = self.chat_history[:1] + self.chat_history[1:][-19:]
 
         return generator()
 
@@ -150,4 +194,24 @@ class VoiceConsumer(AsyncWebsocketConsumer):
         # tts_buffer.seek(0)
         # audio_base64 = base64.b64encode(tts_buffer.read()).decode("utf-8")
         # return audio_base64
-        return None #change afterwards and uncomment the code
\ No newline at end of file
+        return None #change afterwards and uncomment the code
+
+
+class JobConsumer(AsyncWebsocketConsumer):
+    """Pushes {"job": {...}} for each of the user's background jobs as it finishes."""
+
+    async def connect(self):
+        user = self.scope["user"]
+        if not user.is_authenticated:
+            await self.close()
+            return
+        self.group = job_group(user.id)
+        await self.channel_layer.group_add(self.group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        if getattr(self, "group", None):
+            await self.channel_layer.group_discard(self.group, self.channel_name)
+
+    async def job_update(self, event):
+        await self.send(json.dumps({"job": event["job"]}))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from agent.models import UserProfile
+from agent.utils.matchmaking import index_profile
+
+class Command(BaseCommand):
+    help = "Backfill ProfileMoonIndex for every profile (used by matchmaking search)"
+
+    def handle(self, *args, **options):
+        indexed = skipped = 0
+        for profile in UserProfile.objects.iterator():
+            try:
+                row = index_profile(profile)
+            except Exception as e:
+                self.stderr.write(f"Profile {profile.pk}: {e}")
+                row = None
+            if row:
+                indexed += 1
+            else:
+                skipped += 1
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} profiles, skipped {skipped}"))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from agent.utils.timezones import GRID_PATH, CELL_DEG, TimezoneGrid
+
+class Command(BaseCommand):
+    help = "Precompute the coarse timezone grid used by agent.utils.timezones"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cell-deg", type=float, default=CELL_DEG)
+        parser.add_argument("--output", default=GRID_PATH)
+
+    def handle(self, *args, **options):
+        grid = TimezoneGrid(cell_deg=options["cell_deg"])
+        grid.fill()
+        grid.save(options["output"])
+        border = sum(1 for v in grid.cells if v < 0)
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {options['output']}: {len(grid.cells)} cells, {border} border cells, {len(grid.names)} zones"
+        ))
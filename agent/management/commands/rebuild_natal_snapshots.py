@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from agent.models import NatalSnapshot, UserProfile
+from agent.utils.matchmaking import index_profile
+from agent.utils.natal import SNAPSHOT_VERSION, refresh_natal_snapshot
+
+class Command(BaseCommand):
+    help = "Recompute natal snapshots (and the matchmaking index) after a version bump"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Recompute current snapshots too")
+
+    def handle(self, *args, **options):
+        profiles = UserProfile.objects.all()
+        if not options["all"]:
+            current = NatalSnapshot.objects.filter(version=SNAPSHOT_VERSION).values("profile_id")
+            profiles = profiles.exclude(pk__in=current)
+        done = failed = 0
+        for profile in profiles.iterator():
+            try:
+                index_profile(profile, refresh_natal_snapshot(profile))
+                done += 1
+            except Exception as e:
+                self.stderr.write(f"Profile {profile.pk}: {e}")
+                failed += 1
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {done} snapshots, {failed} failed"))
@@ -0,0 +1,75 @@
+from apscheduler.schedulers.blocking import BlockingScheduler
+from apscheduler.triggers.cron import CronTrigger
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django_apscheduler import util
+from django_apscheduler.jobstores import DjangoJobStore
+from django_apscheduler.models import DjangoJobExecution
+
+from agent.utils.horoscope import precompute_horoscopes
+from agent.utils.jobs import delete_finished_jobs
+from agent.utils.panchang_store import precompute_panchang
+
+def precompute_panchang_job():
+    written = precompute_panchang()
+    print(f"Precomputed {written} panchang rows")
+
+def precompute_horoscopes_job():
+    written = precompute_horoscopes()
+    print(f"Precomputed {written} daily horoscopes")
+
+@util.close_old_connections
+def delete_old_job_executions(max_age=604_800):
+    """Drop APScheduler job execution history older than max_age seconds."""
+    DjangoJobExecution.objects.delete_old_job_executions(max_age)
+
+@util.close_old_connections
+def delete_finished_jobs_job():
+    print(f"Deleted {delete_finished_jobs()} finished background jobs")
+
+class Command(BaseCommand):
+    help = "Runs the APScheduler jobs (daily panchang and horoscope precompute)."
+
+    def handle(self, *args, **options):
+        scheduler = BlockingScheduler(timezone=settings.TIME_ZONE)
+        scheduler.add_jobstore(DjangoJobStore(), "default")
+
+        scheduler.add_job(
+            util.close_old_connections(precompute_panchang_job),
+            trigger=CronTrigger(hour="00", minute="05"),
+            id="precompute_panchang",
+            max_instances=1,
+            replace_existing=True,
+        )
+        scheduler.add_job(
+            util.close_old_connections(precompute_horoscopes_job),
+            trigger=CronTrigger(hour="00", minute="10"),
+            id="precompute_horoscopes",
+            max_instances=1,
+            replace_existing=True,
+        )
+        scheduler.add_job(
+            delete_old_job_executions,
+            trigger=CronTrigger(day_of_week="mon", hour="00", minute="00"),
+            id="delete_old_job_executions",
+            max_instances=1,
+            replace_existing=True,
+        )
+
+        scheduler.add_job(
+            delete_finished_jobs_job,
+            trigger=CronTrigger(hour="03", minute="00"),
+            id="delete_finished_jobs",
+            max_instances=1,
+            replace_existing=True,
+        )
+
+        # Fill the table right away instead of waiting for the first run
+        precompute_panchang_job()
+        precompute_horoscopes_job()
+        self.stdout.write("Starting scheduler...")
+        try:
+            scheduler.start()
+        except KeyboardInterrupt:
+            scheduler.shutdown()
+            self.stdout.write("Scheduler stopped.")
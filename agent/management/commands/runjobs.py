@@ -0,0 +1,39 @@
+import multiprocessing
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from agent.utils.jobs import work
+
+def _worker(poll_interval):
+    try:
+        work(poll_interval)
+    except KeyboardInterrupt:
+        pass
+
+class Command(BaseCommand):
+    help = "Runs background job workers (compatibility, tarot and horoscope LLM jobs)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=getattr(settings, "JOB_WORKERS", 2))
+        parser.add_argument("--poll", type=float, default=getattr(settings, "JOB_POLL_INTERVAL", 1.0),
+                            help="Seconds to sleep when the queue is empty")
+
+    def handle(self, *args, **options):
+        workers, poll = max(1, options["workers"]), options["poll"]
+        self.stdout.write(f"Starting {workers} job worker(s)...")
+        if workers == 1:
+            _worker(poll)
+            return
+        # Children must open their own database connections
+        connections.close_all()
+        processes = [multiprocessing.Process(target=_worker, args=(poll,), name=f"job-worker-{i}")
+                     for i in range(workers)]
+        for p in processes:
+            p.start()
+        try:
+            for p in processes:
+                p.join()
+        except KeyboardInterrupt:
+            for p in processes:
+                p.join()
+            self.stdout.write("Job workers stopped.")
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agent', '0007_geocodecache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyPanchang',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lat', models.FloatField()),
+                ('lon', models.FloatField()),
+                ('date', models.DateField()),
+                ('tz_offset', models.FloatField()),
+                ('data', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'unique_together': {('lat', 'lon', 'date', 'tz_offset')},
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agent', '0008_dailypanchang'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileMoonIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nakshatra', models.PositiveSmallIntegerField()),
+                ('rashi', models.PositiveSmallIntegerField()),
+                ('moon_state', models.PositiveSmallIntegerField()),
+                ('mars_house', models.PositiveSmallIntegerField()),
+                ('manglik', models.BooleanField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('profile', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='moon_index', to='agent.userprofile')),
+            ],
+        ),
+    ]
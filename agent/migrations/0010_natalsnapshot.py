@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agent', '0009_profilemoonindex'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NatalSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(max_length=16)),
+                ('birth_key', models.CharField(max_length=128)),
+                ('ascendant', models.CharField(max_length=16)),
+                ('moon_rashi', models.PositiveSmallIntegerField()),
+                ('moon_nakshatra', models.PositiveSmallIntegerField()),
+                ('moon_pada', models.PositiveSmallIntegerField()),
+                ('moon_state', models.PositiveSmallIntegerField()),
+                ('mars_house', models.PositiveSmallIntegerField()),
+                ('planets', models.JSONField()),
+                ('houses', models.JSONField()),
+                ('dasha_lord', models.CharField(max_length=16)),
+                ('dasha_start', models.DateField()),
+                ('dasha_balance_years', models.FloatField()),
+                ('kundali', models.JSONField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('profile', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='natal', to='agent.userprofile')),
+            ],
+        ),
+    ]
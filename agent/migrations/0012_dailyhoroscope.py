@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agent', '0011_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyHoroscope',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sign', models.CharField(max_length=16)),
+                ('date', models.DateField()),
+                ('locale', models.CharField(default='en', max_length=16)),
+                ('text', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'unique_together': {('sign', 'date', 'locale')},
+            },
+        ),
+    ]
@@ -50,4 +50,109 @@ class TarotCard(models.Model):
     image = models.URLField(blank=True, null=True)
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+class GeocodeCache(models.Model):
+    # Normalized place string, see utils.geocoding.normalize_place
+    place_key = models.CharField(max_length=255, unique=True)
+    lat = models.FloatField()
+    lon = models.FloatField()
+    tz = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.place_key} ({self.lat}, {self.lon}, {self.tz})"
+
+class DailyPanchang(models.Model):
+    # Date/place part of the panchang (utils.panchang.get_day_panchang),
+    # precomputed for the busiest cities, see utils.panchang_store
+    lat = models.FloatField()
+    lon = models.FloatField()
+    date = models.DateField()
+    tz_offset = models.FloatField()
+    data = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("lat", "lon", "date", "tz_offset")
+
+    def __str__(self):
+        return f"Panchang({self.date}, {self.lat}, {self.lon})"
+
+class ProfileMoonIndex(models.Model):
+    # What Ashtakoota and Mangal dosha need from a profile's chart, kept up
+    # to date on profile save so matchmaking search never touches the
+    # ephemeris, see utils.matchmaking
+    profile = models.OneToOneField(UserProfile, on_delete=models.CASCADE, related_name="moon_index")
+    nakshatra = models.PositiveSmallIntegerField()
+    rashi = models.PositiveSmallIntegerField()
+    moon_state = models.PositiveSmallIntegerField()
+    mars_house = models.PositiveSmallIntegerField()
+    manglik = models.BooleanField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"MoonIndex({self.profile_id}, state={self.moon_state})"
+
+class NatalSnapshot(models.Model):
+    # The profile's chart, computed once on save, see utils.natal
+    profile = models.OneToOneField(UserProfile, on_delete=models.CASCADE, related_name="natal")
+    version = models.CharField(max_length=16)
+    birth_key = models.CharField(max_length=128)
+    ascendant = models.CharField(max_length=16)
+    moon_rashi = models.PositiveSmallIntegerField()
+    moon_nakshatra = models.PositiveSmallIntegerField()
+    moon_pada = models.PositiveSmallIntegerField()
+    moon_state = models.PositiveSmallIntegerField()
+    mars_house = models.PositiveSmallIntegerField()
+    planets = models.JSONField()
+    houses = models.JSONField()
+    dasha_lord = models.CharField(max_length=16)
+    dasha_start = models.DateField()
+    dasha_balance_years = models.FloatField()
+    kundali = models.JSONField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Natal({self.profile_id}, v{self.version})"
+
+class Job(models.Model):
+    # Slow LLM work queued by the API and run by `manage.py runjobs`,
+    # see utils.jobs
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [(QUEUED, "Queued"), (RUNNING, "Running"), (DONE, "Done"), (FAILED, "Failed")]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name="jobs")
+    kind = models.CharField(max_length=32)
+    params = models.JSONField(default=dict)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "created_at"], name="agent_job_status_idx")]
+
+    def __str__(self):
+        return f"Job({self.pk}, {self.kind}, {self.status})"
+
+class DailyHoroscope(models.Model):
+    # One generated horoscope per sign, day and locale, written by the daily
+    # precompute and read by the horoscope API, see utils.horoscope
+    sign = models.CharField(max_length=16)
+    date = models.DateField()
+    locale = models.CharField(max_length=16, default="en")
+    text = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("sign", "date", "locale")
+
+    def __str__(self):
+        return f"Horoscope({self.sign}, {self.date}, {self.locale})"
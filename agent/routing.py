@@ -4,4 +4,5 @@ from . import consumers
 
 websocket_urlpatterns = [
     re_path(r'ws/voice/$', consumers.VoiceConsumer.as_asgi()),
+    re_path(r'ws/jobs/$', consumers.JobConsumer.as_asgi()),
 ]
\ No newline at end of file
@@ -27,6 +27,9 @@ class PanchangSerializer(serializers.Serializer):
     karana_2 = serializers.CharField()
     karana_1_range = serializers.CharField()
     karana_2_range = serializers.CharField()
+    tithi_range = serializers.CharField()
+    nakshatra_range = serializers.CharField()
+    yoga_range = serializers.CharField()
     vara = serializers.CharField()
     sunrise = serializers.CharField()
     sunset = serializers.CharField()
@@ -0,0 +1,21 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import UserProfile
+from .utils.natal import refresh_natal_snapshot
+from .utils.matchmaking import index_profile
+
+@receiver(post_save, sender=UserProfile)
+def precompute_natal(sender, instance, **kwargs):
+    """
+    Store the natal snapshot (which also warms the kundali cache) and keep
+    the matchmaking index in step with it.
+    """
+    try:
+        snapshot = refresh_natal_snapshot(instance)
+    except Exception as e:
+        print("Natal snapshot error:", e)
+        return
+    try:
+        index_profile(instance, snapshot)
+    except Exception as e:
+        print("Moon index error:", e)
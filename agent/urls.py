@@ -16,6 +16,8 @@ urlpatterns = [
     path('compatibility',views.compatibility,name='compatibility'),
     path('bazi',views.bazi_view,name='bazi'),
     path('panchang',views.panchang_view,name='panchang'),
+    path("places", views.places_autocomplete, name="places"),
+    path("charts/<str:digest>", views.chart_image, name="chart_image"),
     path("tarot", views.tarot_page, name="tarot"),
     path("tarot/draw-card/", views.draw_card, name="draw_card"),
     path("tarot/three-card/", views.three_card_spread, name="three_card_spread"),
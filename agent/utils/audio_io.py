@@ -0,0 +1,106 @@
+# Audio ingestion for transcription.
+# Whisper wants mono float32 at 16 kHz. 16-bit PCM (WAV or raw
+# audio/l16) is read in place: np.frombuffer over the in-memory upload's
+# buffer, or np.memmap over the temporary file Django spills large uploads
+# to. It is converted block by block into the output array, so peak memory
+# is the 16 kHz result plus one block. Compressed formats (webm/ogg/mp3 from
+# MediaRecorder) are decoded by faster-whisper straight from the file
+# object or path, never read into a bytes copy first.
+
+import struct
+import numpy as np
+from .speech import WHISPER_RATE
+
+BLOCK_FRAMES = 1 << 18          # input frames converted per block (~5 s at 48 kHz)
+DEFAULT_L16_RATE = 48000        # what the voice socket sends
+
+def _wav_layout(f):
+    """
+    (channels, rate, data_offset, data_bytes) for a 16-bit PCM WAV file
+    object, or None for anything else. Leaves f at position 0.
+    """
+    try:
+        f.seek(0)
+        riff, _, wave_id = struct.unpack("<4sI4s", f.read(12))
+        if riff != b"RIFF" or wave_id != b"WAVE":
+            return None
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                return None
+            chunk_id, size = struct.unpack("<4sI", header)
+            if chunk_id == b"fmt ":
+                fmt = struct.unpack("<HHIIHH", f.read(16))
+                f.seek(size - 16 + (size & 1), 1)
+            elif chunk_id == b"data":
+                if fmt is None or fmt[0] != 1 or fmt[5] != 16:
+                    return None
+                return fmt[1], fmt[2], f.tell(), size
+            else:
+                f.seek(size + (size & 1), 1)
+    finally:
+        f.seek(0)
+
+def pcm16_to_whisper(samples, rate, channels=1, block=BLOCK_FRAMES):
+    """
+    Interleaved int16 samples (array, frombuffer view or memmap) -> mono
+    float32 at 16 kHz. Integer ratios average each group of samples;
+    others are linearly interpolated.
+    """
+    frames = len(samples) // channels
+    samples = samples[:frames * channels].reshape(frames, channels)
+    if rate % WHISPER_RATE == 0:
+        factor = rate // WHISPER_RATE
+        out = np.empty(frames // factor, dtype="f4")
+        step = block - block % factor
+        for start in range(0, len(out) * factor, step):
+            chunk = samples[start:min(start + step, len(out) * factor)]
+            out[start // factor:start // factor + len(chunk) // factor] = (
+                chunk.reshape(-1, factor * channels).mean(axis=1, dtype="f4") / 32768.0)
+        return out
+    ratio = rate / WHISPER_RATE
+    out = np.empty(int(frames / ratio), dtype="f4")
+    for o in range(0, len(out), block):
+        pos = np.arange(o, min(o + block, len(out))) * ratio
+        lo, hi = int(pos[0]), min(frames, int(pos[-1]) + 2)
+        chunk = samples[lo:hi].mean(axis=1, dtype="f4") / 32768.0
+        out[o:o + len(pos)] = np.interp(pos - lo, np.arange(hi - lo), chunk)
+    return out
+
+def _l16_rate(content_type):
+    """Sample rate of an audio/l16 (raw PCM) content type, else None."""
+    kind, _, params = (content_type or "").partition(";")
+    if kind.strip().lower() != "audio/l16":
+        return None
+    for param in params.split(";"):
+        key, _, value = param.partition("=")
+        if key.strip().lower() == "rate" and value.strip().isdigit():
+            return int(value)
+    return DEFAULT_L16_RATE
+
+def _pcm_view(uploaded, offset, nbytes):
+    """int16 samples of the upload without copying: memmap on disk, frombuffer in memory."""
+    count = nbytes // 2
+    if hasattr(uploaded, "temporary_file_path"):
+        return np.memmap(uploaded.temporary_file_path(), dtype="<i2", mode="r", offset=offset, shape=(count,))
+    f = uploaded.file
+    buffer = f.getbuffer() if hasattr(f, "getbuffer") else f.read()
+    return np.frombuffer(buffer, dtype="<i2", count=count, offset=offset)
+
+def load_audio(uploaded):
+    """Mono float32 16 kHz samples from a Django UploadedFile."""
+    rate = _l16_rate(getattr(uploaded, "content_type", None))
+    if rate:
+        size = uploaded.size - uploaded.size % 2
+        return pcm16_to_whisper(_pcm_view(uploaded, 0, size), rate)
+    layout = _wav_layout(uploaded.file)
+    if layout:
+        channels, rate, offset, nbytes = layout
+        nbytes = min(nbytes, uploaded.size - offset)
+        return pcm16_to_whisper(_pcm_view(uploaded, offset, nbytes), rate, channels)
+    from faster_whisper import decode_audio
+    if hasattr(uploaded, "temporary_file_path"):
+        return decode_audio(uploaded.temporary_file_path(), sampling_rate=WHISPER_RATE)
+    uploaded.file.seek(0)
+    return decode_audio(uploaded.file, sampling_rate=WHISPER_RATE)
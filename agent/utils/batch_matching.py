@@ -0,0 +1,126 @@
+# Bulk kundali matching.
+# A batch of (person1, person2) pairs is reduced to its distinct birth
+# records and distinct places first: every place is geocoded once, every
+# record's chart (swe.houses + Moon/Mars) is computed once in a process
+# pool, and the per-pair Ashtakoota is a table lookup on top of those
+# (see kundali_matching.matching_from_charts). Results are yielded in
+# input order as soon as both charts of a pair are ready.
+
+import csv
+import io
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from django.conf import settings
+from .geocoding import geocode_place_timezone, normalize_place
+from .kundali_matching import local_to_jd_ut, matching_from_charts, moon_chart_at
+
+MAX_PAIRS = 1000
+# Below this many distinct records the pool's startup costs more than it saves
+POOL_THRESHOLD = 16
+CSV_FIELDS = ("Date", "Time", "Place")
+
+@lru_cache(maxsize=1)
+def get_pool():
+    workers = getattr(settings, "BATCH_MATCH_WORKERS", None) or os.cpu_count() or 1
+    return ProcessPoolExecutor(max_workers=workers)
+
+def _chart_worker(args):
+    jd, lat, lon = args
+    return moon_chart_at(jd, lat, lon)
+
+def pairs_from_csv(text):
+    """
+    Pairs from CSV with a header of p1_date, p1_time, p1_place, p2_date,
+    p2_time, p2_place and optionally id, p1_name, p2_name.
+    """
+    pairs = []
+    for row in csv.DictReader(io.StringIO(text)):
+        row = {k.strip().lower(): (v or "").strip() for k, v in row.items() if k}
+        pair = {f"person{n}": {f: row.get(f"p{n}_{f.lower()}", "") for f in CSV_FIELDS} for n in (1, 2)}
+        for n in (1, 2):
+            if row.get(f"p{n}_name"):
+                pair[f"person{n}"]["Name"] = row[f"p{n}_name"]
+        if row.get("id"):
+            pair["id"] = row["id"]
+        pairs.append(pair)
+    return pairs
+
+def _people(pair):
+    """(person1, person2) of a pair; ValueError when the pair or a person isn't an object."""
+    if not isinstance(pair, dict):
+        raise ValueError("Each pair must be an object with person1 and person2")
+    people = (pair.get("person1") or {}, pair.get("person2") or {})
+    if not all(isinstance(person, dict) for person in people):
+        raise ValueError("person1 and person2 must be objects with Date, Time and Place")
+    return people
+
+def _record_key(person):
+    """Identity of a birth record; two people born at the same time and place match it."""
+    return (str(person.get("Date", "")).strip(), str(person.get("Time", "")).strip(),
+            normalize_place(person.get("Place", "")))
+
+def _failed(error):
+    f = Future()
+    f.set_exception(error)
+    return f
+
+def iter_batch_matching(pairs):
+    """
+    Yield {"index", "id"?, "result" | "error"} for every pair, in order.
+    Each pair is {"person1": {Date, Time, Place}, "person2": {...}, "id"?};
+    a malformed pair gets an error line like any other bad row.
+    """
+    records = {}
+    for pair in pairs:
+        try:
+            people = _people(pair)
+        except ValueError:
+            continue
+        for person in people:
+            records.setdefault(_record_key(person), person)
+
+    places = {}
+    for _, _, place_key in records:
+        if place_key not in places:
+            places[place_key] = geocode_place_timezone(place_key) if place_key else (None, None, None)
+
+    jobs = {}
+    for key, person in records.items():
+        date_str, time_str, place_key = key
+        lat, lon, tz = places[place_key]
+        try:
+            if lat is None:
+                raise ValueError(f"Could not geocode place: {person.get('Place')}")
+            local_dt = datetime.strptime(f"{date_str} {time_str[:5]}", "%Y-%m-%d %H:%M")
+            jobs[key] = (local_to_jd_ut(local_dt, tz), lat, lon)
+        except ValueError as e:
+            jobs[key] = e
+
+    valid = [k for k, v in jobs.items() if not isinstance(v, Exception)]
+    if len(valid) >= POOL_THRESHOLD:
+        pool = get_pool()
+        futures = {k: pool.submit(_chart_worker, jobs[k]) for k in valid}
+    else:
+        futures = {}
+        for k in valid:
+            f = Future()
+            f.set_result(_chart_worker(jobs[k]))
+            futures[k] = f
+    for k, v in jobs.items():
+        if isinstance(v, Exception):
+            futures[k] = _failed(v)
+
+    for index, pair in enumerate(pairs):
+        out = {"index": index}
+        if isinstance(pair, dict) and "id" in pair:
+            out["id"] = pair["id"]
+        try:
+            person1, person2 = _people(pair)
+            c1 = futures[_record_key(person1)].result()
+            c2 = futures[_record_key(person2)].result()
+            out["result"] = matching_from_charts(c1, c2)
+        except Exception as e:
+            out["error"] = str(e)
+        yield out
@@ -0,0 +1,106 @@
+# Start/end instants of the panchang limbs.
+# Tithi and karana are segments of the Moon-Sun elongation (12 and 6 deg),
+# nakshatra of the Moon's longitude and yoga of Sun+Moon (13 deg 20 min each).
+# All three angles increase monotonically, so every boundary is the single
+# root of wrap(angle(t) - target) near t. Roots are found with Newton steps
+# on the Swiss Ephemeris speeds, kept inside the bracket once the sign has
+# changed (bisection otherwise). Sun/Moon samples are memoized per JD and
+# roots per (angle, target), so tithi and karana share their elongation
+# boundaries and the whole set costs a few dozen calc_ut calls.
+
+import swisseph as swe
+
+NAK_SPAN = 360.0 / 27.0
+TOLERANCE_DAYS = 1e-5   # ~1 second
+MAX_ITER = 12
+
+def _wrap180(a):
+    return (a + 180.0) % 360.0 - 180.0
+
+# angle name -> (angle(sun, moon), rate(sun_speed, moon_speed)) in deg, deg/day
+ANGLES = {
+    "elongation": (lambda s, m: (m - s) % 360.0, lambda ds, dm: dm - ds),
+    "moon": (lambda s, m: m % 360.0, lambda ds, dm: dm),
+    "yoga": (lambda s, m: (s + m) % 360.0, lambda ds, dm: ds + dm),
+}
+
+# limb -> (angle name, segment size in degrees)
+LIMBS = {
+    "tithi": ("elongation", 12.0),
+    "karana": ("elongation", 6.0),
+    "nakshatra": ("moon", NAK_SPAN),
+    "yoga": ("yoga", NAK_SPAN),
+}
+
+class BoundarySolver:
+    """
+    Sidereal Sun/Moon sampler plus root finder for one panchang request.
+    `calls` counts swe.calc_ut invocations (two per new sample).
+    """
+
+    def __init__(self, sid_mode=swe.SIDM_LAHIRI):
+        swe.set_sid_mode(sid_mode)
+        self.flag = swe.FLG_SIDEREAL | swe.FLG_SPEED
+        self.samples = {}
+        self.roots = {}
+        self.calls = 0
+
+    def sample(self, jd):
+        """(sun_lon, moon_lon, sun_speed, moon_speed) at jd (UT)."""
+        s = self.samples.get(jd)
+        if s is None:
+            sun, _ = swe.calc_ut(jd, swe.SUN, self.flag)
+            moon, _ = swe.calc_ut(jd, swe.MOON, self.flag)
+            self.calls += 2
+            s = self.samples[jd] = (sun[0], moon[0], sun[3], moon[3])
+        return s
+
+    def angle(self, name, jd):
+        sun, moon, _, _ = self.sample(jd)
+        return ANGLES[name][0](sun, moon)
+
+    def crossing(self, name, target, jd):
+        """JD (UT) nearest to jd at which angle `name` equals target."""
+        target = target % 360.0
+        key = (name, round(target, 9))
+        if key in self.roots:
+            return self.roots[key]
+        angle_fn, rate_fn = ANGLES[name]
+        lo = hi = None
+        x = jd
+        for _ in range(MAX_ITER):
+            sun, moon, ds, dm = self.sample(x)
+            g = _wrap180(angle_fn(sun, moon) - target)
+            rate = rate_fn(ds, dm)
+            step = g / rate
+            if abs(step) < TOLERANCE_DAYS:
+                break
+            if g < 0:
+                lo = x
+            else:
+                hi = x
+            x = x - step
+            if lo is not None and hi is not None and not lo < x < hi:
+                x = (lo + hi) / 2.0
+        self.roots[key] = x
+        return x
+
+    def limb(self, limb, jd):
+        """(index, start_jd, end_jd) of the limb segment containing jd."""
+        name, span = LIMBS[limb]
+        index = int(self.angle(name, jd) // span)
+        start = self.crossing(name, index * span, jd)
+        end = self.crossing(name, (index + 1) * span, jd)
+        return index, start, end
+
+    def all_limbs(self, jd):
+        """
+        {limb: (index, start_jd, end_jd)} for tithi, nakshatra, yoga and
+        karana, plus "next_karana" for the karana after the current one.
+        """
+        out = {limb: self.limb(limb, jd) for limb in LIMBS}
+        k_index, _, k_end = out["karana"]
+        next_index = (k_index + 1) % 60
+        out["next_karana"] = (next_index, k_end,
+                              self.crossing("elongation", (next_index + 1) * 6.0, k_end))
+        return out
@@ -0,0 +1,86 @@
+# Content-addressed chart image cache.
+# Charts are pure functions of what they show (sign numbers + planet labels,
+# BaZi element counts), so the image is stored under a hash of that content
+# and served from /charts/<digest> with the digest as a strong ETag.
+# The store is bounded (MAX_ENTRIES) and evicts least recently used images,
+# so a URL stays valid while it is in use but can expire once thousands of
+# other charts have been drawn since it was last served; the pages that hand
+# out URLs store the image again when they render.
+
+import hashlib
+import json
+import os
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.urls import reverse
+
+CACHE_ALIAS = "charts"
+KEY_PREFIX = "chart:"
+
+class LRUFileBasedCache(FileBasedCache):
+    """FileBasedCache whose cull drops the least recently used files instead of random ones."""
+
+    def _used(self, key, version):
+        try:
+            os.utime(self._key_to_file(key, version))
+        except FileNotFoundError:
+            pass
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, default, version)
+        if value is not default:
+            self._used(key, version)
+        return value
+
+    def has_key(self, key, version=None):
+        found = super().has_key(key, version)
+        if found:
+            self._used(key, version)
+        return found
+
+    def _cull(self):
+        filelist = self._list_cache_files()
+        num_entries = len(filelist)
+        if num_entries < self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            return self.clear()
+        def last_used(fname):
+            try:
+                return os.stat(fname).st_mtime
+            except FileNotFoundError:
+                return 0
+        filelist.sort(key=last_used)
+        for fname in filelist[:int(num_entries / self._cull_frequency)]:
+            self._delete(fname)
+
+def content_digest(kind, content):
+    payload = json.dumps([kind, content], sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:40]
+
+def cached_chart(kind, content, render, mime):
+    """(digest, image bytes) for (kind, content), rendering and storing it on a miss."""
+    digest = content_digest(kind, content)
+    cache = caches[CACHE_ALIAS]
+    key = KEY_PREFIX + digest
+    found = cache.get(key)
+    if found is None:
+        found = (mime, render())
+        cache.set(key, found, timeout=None)
+    return digest, found[1]
+
+def chart_url(kind, content, render, mime):
+    """
+    Path of the cached image for (kind, content). render is a zero-argument
+    callable returning the image bytes and only runs on a cache miss.
+    """
+    digest = content_digest(kind, content)
+    cache = caches[CACHE_ALIAS]
+    key = KEY_PREFIX + digest
+    if not cache.has_key(key):
+        cache.set(key, (mime, render()), timeout=None)
+    return reverse("chart_image", args=[digest])
+
+def get_chart(digest):
+    """(mime, bytes) or None if the image was never stored or got evicted."""
+    return caches[CACHE_ALIAS].get(KEY_PREFIX + digest)
@@ -0,0 +1,76 @@
+# North Indian (diamond) chart as SVG.
+# The layout is a fixed set of 12 polygons, so everything except the labels
+# is precomputed at import time and a chart is a single string format.
+
+from html import escape
+
+# Polygon points for each house in North Indian style, counter-clockwise
+HOUSE_POINTS = {
+    1: [(100,75), (200,150), (300,75), (200,0)],  # Top diamond (House 1)
+    2: [(0,0), (100,75), (200,0)],  # Top-left upper triangle
+    3: [(0,0), (0,150), (100,75)],  # Top-left lower triangle
+    4: [(0,150), (100,225), (200,150), (100,75)],  # Left diamond
+    5: [(0,150), (0,300), (100,225)],  # Bottom-left upper triangle
+    6: [(100,225), (0,300), (200,300)],  # Bottom-left lower triangle
+    7: [(100,225), (200,300), (300,225), (200,150)],  # Bottom diamond (House 7)
+    8: [(300,225), (200,300), (400,300)],  # Bottom-right lower triangle
+    9: [(300,225), (400,300), (400,150)],  # Bottom-right upper triangle
+    10: [(300,75), (200,150), (300,225), (400,150)],  # Right diamond
+    11: [(300,75), (400,150), (400,0)],  # Top-right lower triangle
+    12: [(200,0), (300,75), (400,0)]  # Top-right upper triangle
+}
+
+HOUSE_CENTERS = {
+    h: (sum(p[0] for p in pts) / len(pts), sum(p[1] for p in pts) / len(pts))
+    for h, pts in HOUSE_POINTS.items()
+}
+
+LINE_HEIGHT = 8
+
+_FRAME = "".join(
+    '<polygon points="{}" fill="none" stroke="black" stroke-width="1.4"/>'.format(
+        " ".join(f"{x},{y}" for x, y in pts))
+    for pts in HOUSE_POINTS.values()
+)
+
+SVG_TEMPLATE = (
+    '<svg xmlns="http://www.w3.org/2000/svg" viewBox="-4 -4 408 308" width="800" height="600" '
+    'font-family="DejaVu Sans, Arial, sans-serif" text-anchor="middle" dominant-baseline="central">'
+    '<rect x="-4" y="-4" width="408" height="308" fill="white"/>'
+    + _FRAME +
+    '{labels}</svg>'
+)
+
+def _house_labels(house, sign_num, lines):
+    cx, cy = HOUSE_CENTERS[house]
+    out = [f'<text x="{cx:g}" y="{cy + 20:g}" font-size="7.5" fill="orange">{sign_num}</text>']
+    if lines:
+        y0 = cy + 10 - (len(lines) - 1) * LINE_HEIGHT / 2
+        spans = "".join(
+            f'<tspan x="{cx:g}" y="{y0 + i * LINE_HEIGHT:g}">{escape(str(line))}</tspan>'
+            for i, line in enumerate(lines)
+        )
+        out.append(f'<text font-size="7" fill="blue">{spans}</text>')
+    return "".join(out)
+
+def north_indian_svg(house_sign_nums, house_lines):
+    """
+    house_sign_nums: {house: sign number 1..12}
+    house_lines: {house: [label, ...]} planet labels stacked around the centre
+    Returns the SVG document as a str.
+    """
+    labels = "".join(
+        _house_labels(h, house_sign_nums[h], house_lines.get(h)) for h in HOUSE_POINTS
+    )
+    return SVG_TEMPLATE.format(labels=labels)
+
+def svg_to_png(svg):
+    """
+    Rasterize with cairosvg when it is installed; returns None otherwise so
+    callers can fall back to another renderer.
+    """
+    try:
+        import cairosvg
+    except ImportError:
+        return None
+    return cairosvg.svg2png(bytestring=svg.encode("utf-8"))
@@ -1,8 +1,7 @@
 import sxtwl
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import io, base64
+from .chart_cache import chart_url
 
 # Heavenly Stems & Earthly Branches
 STEMS = ["Jia 甲", "Yi 乙", "Bing 丙", "Ding 丁", "Wu 戊", "Ji 己", "Geng 庚", "Xin 辛", "Ren 壬", "Gui 癸"]
@@ -61,10 +60,51 @@ def get_ten_god(day_stem, other_stem):
         return "正官 (Official)" if other_polarity != dm_polarity else "七杀 (Seven Killings)"
     return "Unknown"
 
+def draw_element_chart(element_count):
+    """Element balance bar chart as PNG bytes."""
+    fig = Figure()
+    ax = fig.add_subplot()
+    elements = list(element_count.keys())
+    values = list(element_count.values())
+    colors = [ELEMENT_COLORS[e] for e in elements]
+    bars=ax.bar(elements, values, color=colors)
+    total = sum(values)
+    for bar, value in zip(bars, values):
+        percent = round((value / total) * 100, 1) if total > 0 else 0
+        if value >= total * 0.1:  # if bar is tall enough
+            ax.text(
+                bar.get_x() + bar.get_width() / 2, 
+                value / 2,  # inside the bar
+                f"{percent}%", 
+                ha="center", va="center", fontsize=10, fontweight="bold", color="white"
+            )
+        else:
+            ax.text(
+                bar.get_x() + bar.get_width() / 2, 
+                value + 0.05,  # slightly above
+                f"{percent}%", 
+                ha="center", va="bottom", fontsize=10, fontweight="bold", color="black"
+            )
+    ax.set_title("Element Balance in Your BaZi Chart")
+    ax.set_ylabel("Count")
+    fig.tight_layout()
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png")
+    return buf.getvalue()
+
+def element_chart_url(element_percentages):
+    """
+    Content-addressed URL of the element chart (see utils.chart_cache);
+    everyone with the same element counts shares one image.
+    """
+    element_count = {e: info["count"] for e, info in element_percentages.items()}
+    return chart_url("bazi-elements.png", element_count, lambda: draw_element_chart(element_count), "image/png")
+
 def pillar(stem_index, branch_index):
     return f"{STEMS[stem_index]} - {BRANCHES[branch_index]}"
 
-def generate_bazi(year, month, day, hour):
+def generate_bazi(year, month, day, hour, render=True):
     day_obj = sxtwl.fromSolar(year, month, day)
     year_gz = day_obj.getYearGZ()
     month_gz = day_obj.getMonthGZ()
@@ -94,38 +134,9 @@ def generate_bazi(year, month, day, hour):
     day_master = STEMS[day_gz.tg]
     master_info = DAY_MASTER_INFO[day_master]
     
-    # Element balance chart
-    fig, ax = plt.subplots()
-    elements = list(element_count.keys())
-    values = list(element_count.values())
-    colors = [ELEMENT_COLORS[e] for e in elements]
-    bars=ax.bar(elements, values, color=colors)
-    total = sum(values)
-    for bar, value in zip(bars, values):
-        percent = round((value / total) * 100, 1) if total > 0 else 0
-        if value >= total * 0.1:  # if bar is tall enough
-            ax.text(
-                bar.get_x() + bar.get_width() / 2, 
-                value / 2,  # inside the bar
-                f"{percent}%", 
-                ha="center", va="center", fontsize=10, fontweight="bold", color="white"
-            )
-        else:
-            ax.text(
-                bar.get_x() + bar.get_width() / 2, 
-                value + 0.05,  # slightly above
-                f"{percent}%", 
-                ha="center", va="bottom", fontsize=10, fontweight="bold", color="black"
-            )
-    ax.set_title("Element Balance in Your BaZi Chart")
-    ax.set_ylabel("Count")
-    plt.tight_layout()
-
-    buf = io.BytesIO()
-    plt.savefig(buf, format="png")
-    buf.seek(0)
-    chart_base64 = base64.b64encode(buf.read()).decode("utf-8")
-    plt.close()
+    chart_base64 = None
+    if render:
+        chart_base64 = base64.b64encode(draw_element_chart(element_count)).decode("utf-8")
     # Calculate percentages
     total = sum(element_count.values())
     element_percentages = {}
@@ -0,0 +1,37 @@
+# Batch ephemeris: every body computed once per Julian day.
+# Positions come back as a NumPy record array so charts can read longitude,
+# speed (and so retrograde state) without further Swiss Ephemeris calls.
+
+import numpy as np
+import swisseph as swe
+
+PLANETS = ["Sun", "Moon", "Mars", "Mercury", "Jupiter", "Venus", "Saturn", "Rahu", "Ketu"]
+PLANET_INDEX = {pl: i for i, pl in enumerate(PLANETS)}
+
+# Bodies actually sent to swe.calc_ut; Ketu is derived from Rahu.
+_BODIES = [swe.SUN, swe.MOON, swe.MARS, swe.MERCURY, swe.JUPITER, swe.VENUS, swe.SATURN, swe.MEAN_NODE]
+_KETU = PLANET_INDEX["Ketu"]
+_RAHU = PLANET_INDEX["Rahu"]
+
+POSITION_DTYPE = np.dtype([("lon", "f8"), ("speed", "f8"), ("flags", "i4")])
+
+def compute_positions(jd, sid_mode=swe.SIDM_LAHIRI):
+    """
+    jd: a Julian day (UT) or an array of them.
+    Returns a record array of POSITION_DTYPE with shape (9,) for a scalar jd,
+    or (len(jd), 9) for an array, indexed by PLANET_INDEX.
+    """
+    swe.set_sid_mode(sid_mode)
+    jds = np.atleast_1d(np.asarray(jd, dtype="f8"))
+    out = np.zeros((jds.size, len(PLANETS)), dtype=POSITION_DTYPE)
+    flag = swe.FLG_SIDEREAL | swe.FLG_SPEED
+    for row, t in enumerate(jds):
+        for col, body in enumerate(_BODIES):
+            xx, ret = swe.calc_ut(float(t), body, flag)
+            out[row, col] = (xx[0], xx[3], ret)
+    out["lon"][:, _KETU] = (out["lon"][:, _RAHU] + 180.0) % 360.0
+    out["speed"][:, _KETU] = out["speed"][:, _RAHU]
+    out["flags"][:, _KETU] = out["flags"][:, _RAHU]
+    if np.ndim(jd) == 0:
+        return out[0]
+    return out
@@ -0,0 +1,128 @@
+# Offline place index built from a GeoNames-style dump.
+# The bundled agent/data/places.tsv covers the cities we see most; a full
+# GeoNames cities file (e.g. cities15000.txt) can be pointed at with
+# settings.GAZETTEER_PATH and is read as-is.
+
+import bisect
+import csv
+import os
+import re
+import unicodedata
+from collections import namedtuple
+from functools import lru_cache
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "places.tsv")
+FUZZY_THRESHOLD = 0.55
+
+Place = namedtuple("Place", "name country_code country admin1 lat lon tz population")
+
+def _norm(text):
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"\s+", " ", text.lower()).strip()
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i+3] for i in range(len(padded) - 2)}
+
+def _parse_row(row):
+    """
+    Accepts either the bundled 9-column layout or a raw 19-column GeoNames row.
+    """
+    if len(row) >= 19:
+        # geonameid, name, asciiname, alternatenames, lat, lon, fclass, fcode,
+        # cc, cc2, admin1, admin2, admin3, admin4, population, elevation, dem, tz, moddate
+        names = [row[1], row[2]] + row[3].split(",")
+        return names, Place(row[1], row[8], "", row[10], float(row[4]), float(row[5]),
+                            row[17], int(row[14] or 0))
+    name, alt, lat, lon, cc, country, admin1, tz, pop = row[:9]
+    names = [name] + alt.split(",")
+    return names, Place(name, cc, country, admin1, float(lat), float(lon), tz, int(pop or 0))
+
+class Gazetteer:
+    def __init__(self, rows):
+        self.places = []
+        self.by_name = {}       # normalized name/alt name -> [place index]
+        self.trigrams = {}      # trigram -> set of normalized names
+        for row in rows:
+            if not row or row[0].startswith("#"):
+                continue
+            names, place = _parse_row(row)
+            if not place.tz:
+                continue
+            idx = len(self.places)
+            self.places.append(place)
+            for n in {_norm(n) for n in names if n.strip()}:
+                self.by_name.setdefault(n, []).append(idx)
+        for n in self.by_name:
+            for tg in _trigrams(n):
+                self.trigrams.setdefault(tg, set()).add(n)
+        self.keys = sorted(self.by_name)
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding="utf-8", newline="") as f:
+            return cls(csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE))
+
+    def _fuzzy_names(self, name):
+        grams = _trigrams(name)
+        counts = {}
+        for tg in grams:
+            for n in self.trigrams.get(tg, ()):
+                counts[n] = counts.get(n, 0) + 1
+        best, best_score = [], FUZZY_THRESHOLD
+        for n, shared in counts.items():
+            score = shared / (len(grams) + len(_trigrams(n)) - shared)
+            if score > best_score:
+                best, best_score = [n], score
+            elif score == best_score:
+                best.append(n)
+        return best
+
+    def lookup(self, place_name):
+        """
+        Resolve "City[, region][, country]" to a Place, or None.
+        The name must match exactly (or an alternate name) and every
+        qualifier must be the candidate's admin1, country or country code;
+        anything else is left to Nominatim, since a wrong answer here is
+        memoized for every chart computed for that place.
+        """
+        parts = [p for p in (_norm(p) for p in str(place_name).split(",")) if p]
+        if not parts:
+            return None
+        name, quals = parts[0], set(parts[1:])
+        best = None
+        for i in self.by_name.get(name, ()):
+            place = self.places[i]
+            if not quals <= {_norm(place.admin1), _norm(place.country), _norm(place.country_code)} - {""}:
+                continue
+            if best is None or place.population > best.population:
+                best = place
+        return best
+
+    def search(self, prefix, limit=10):
+        """
+        Autocomplete over names and alternate names, most populous first.
+        Prefix matches come first; trigram matches fill in for typos.
+        """
+        prefix = _norm(prefix)
+        if not prefix:
+            return []
+        found = set()
+        i = bisect.bisect_left(self.keys, prefix)
+        while i < len(self.keys) and self.keys[i].startswith(prefix):
+            found.update(self.by_name[self.keys[i]])
+            i += 1
+        places = sorted((self.places[i] for i in found), key=lambda p: -p.population)
+        if len(places) < limit:
+            fuzzy = {i for n in self._fuzzy_names(prefix) for i in self.by_name[n]} - found
+            places += sorted((self.places[i] for i in fuzzy), key=lambda p: -p.population)
+        return places[:limit]
+
+def display_name(place):
+    return ", ".join(p for p in (place.name, place.admin1, place.country) if p)
+
+@lru_cache(maxsize=1)
+def get_gazetteer():
+    from django.conf import settings
+    path = getattr(settings, "GAZETTEER_PATH", None) or DEFAULT_PATH
+    return Gazetteer.from_file(path)
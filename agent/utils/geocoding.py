@@ -0,0 +1,81 @@
+# Shared place -> (lat, lon, tz) resolution.
+# Lookups go: in-process LRU -> offline gazetteer -> GeocodeCache table ->
+# Nominatim, so a place that has been resolved once never leaves the process
+# again and common places never leave it at all.
+
+import re
+from functools import lru_cache
+from geopy.geocoders import Nominatim
+import pytz
+from .gazetteer import get_gazetteer
+from .timezones import timezone_at
+
+USER_AGENT = "astro_ai_app"
+TIMEOUT = 10
+LRU_SIZE = 4096
+
+def normalize_place(place_name):
+    """
+    "Ahmedabad, Gujarat , India" -> "ahmedabad,gujarat,india"
+    """
+    if not place_name:
+        return ""
+    parts = [re.sub(r"\s+", " ", p).strip() for p in str(place_name).lower().split(",")]
+    return ",".join(p for p in parts if p)
+
+def _geocode_remote(place_name):
+    geolocator = Nominatim(user_agent=USER_AGENT, timeout=TIMEOUT)
+    loc = geolocator.geocode(place_name)
+    if not loc:
+        return None
+    lat, lon = float(loc.latitude), float(loc.longitude)
+    tzname = timezone_at(lat, lon)
+    if not tzname:
+        return None
+    return lat, lon, tzname
+
+@lru_cache(maxsize=LRU_SIZE)
+def _resolve(key):
+    """
+    Returns (lat, lon, tzname) for a normalized key.
+    Raises LookupError when the place can't be resolved so that failures
+    are not memoized by lru_cache.
+    """
+    from ..models import GeocodeCache
+
+    place = get_gazetteer().lookup(key)
+    if place:
+        return place.lat, place.lon, place.tz
+
+    row = GeocodeCache.objects.filter(place_key=key).first()
+    if row:
+        return row.lat, row.lon, row.tz
+
+    found = _geocode_remote(key)
+    if not found:
+        raise LookupError(key)
+    lat, lon, tzname = found
+    GeocodeCache.objects.update_or_create(
+        place_key=key, defaults={"lat": lat, "lon": lon, "tz": tzname}
+    )
+    return lat, lon, tzname
+
+def geocode_place_timezone(place_name: str):
+    """
+    Returns (lat, lon, tzinfo) or (None, None, None) if geocoding fails.
+    """
+    key = normalize_place(place_name)
+    if not key:
+        return None, None, None
+    try:
+        lat, lon, tzname = _resolve(key)
+        return lat, lon, pytz.timezone(tzname)
+    except LookupError:
+        return None, None, None
+    except Exception as e:
+        print("Geocoding error:", e)
+        return None, None, None
+
+def clear_cache():
+    """Drop the in-process LRU (the DB table is left untouched)."""
+    _resolve.cache_clear()
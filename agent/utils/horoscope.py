@@ -0,0 +1,71 @@
+# Daily sign horoscopes.
+# A horoscope depends only on the sign, the day and the language, so the
+# twelve of them are generated once a day per locale (`runapscheduler`,
+# shortly after midnight) into DailyHoroscope and the API reads that
+# table. A miss (new locale, scheduler not running yet) generates and
+# stores the one row on demand.
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from ..models import DailyHoroscope
+from .llm import complete
+
+SIGNS = ["Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo",
+         "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces"]
+DEFAULT_LOCALE = "en"
+
+def normalize_sign(value):
+    """ "leo", "Leo ♌" -> "Leo"; None for anything that isn't a sign."""
+    words = str(value or "").split()
+    sign = words[0].capitalize() if words else ""
+    return sign if sign in SIGNS else None
+
+def horoscope_locales():
+    return getattr(settings, "HOROSCOPE_LOCALES", [DEFAULT_LOCALE])
+
+def normalize_locale(value):
+    """ "EN", " en " -> "en"; None for anything not in HOROSCOPE_LOCALES."""
+    code = str(value or "").strip().lower()
+    return next((l for l in horoscope_locales() if l.lower() == code), None)
+
+def generate_horoscope(sign, locale=DEFAULT_LOCALE):
+    """Today's horoscope for `sign` from the LLM (3-4 sentences)."""
+    prompt = f"Give me today's horoscope for the zodiac sign {sign} in 3-4 sentences. Keep it positive and inspiring."
+    if locale != DEFAULT_LOCALE:
+        prompt += f" Write it in the language with code '{locale}'."
+    return complete([
+        {"role": "system", "content": "You are an expert astrologer who gives daily horoscopes."},
+        {"role": "user", "content": prompt}
+    ])
+
+def _store(sign, day, locale):
+    text = generate_horoscope(sign, locale)
+    try:
+        with transaction.atomic():
+            return DailyHoroscope.objects.create(sign=sign, date=day, locale=locale, text=text)
+    except IntegrityError:
+        # Another worker stored it first
+        return DailyHoroscope.objects.get(sign=sign, date=day, locale=locale)
+
+def get_daily_horoscope(sign, locale=DEFAULT_LOCALE, day=None):
+    """The stored horoscope text, generating it on a miss."""
+    day = day or timezone.localdate()
+    row = DailyHoroscope.objects.filter(sign=sign, date=day, locale=locale).first()
+    return (row or _store(sign, day, locale)).text
+
+def precompute_horoscopes(day=None, locales=None):
+    """Generate every sign's horoscope for `day` (default today) that isn't stored; returns the count."""
+    day = day or timezone.localdate()
+    written = 0
+    for locale in locales or horoscope_locales():
+        have = set(DailyHoroscope.objects.filter(date=day, locale=locale).values_list("sign", flat=True))
+        for sign in SIGNS:
+            if sign in have:
+                continue
+            try:
+                _store(sign, day, locale)
+                written += 1
+            except Exception as e:
+                print(f"Horoscope {sign}/{locale} for {day} failed: {e}")
+    return written
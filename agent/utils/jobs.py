@@ -0,0 +1,149 @@
+# Background jobs.
+# Multi-second LLM work (compatibility reports, tarot readings, horoscopes)
+# is stored as a Job row and answered with 202 + the job id. Workers
+# started by `manage.py runjobs` claim queued rows with a conditional UPDATE
+# (safe with several worker processes on any database), run the handler
+# registered for the job's kind and store the result. Completion is pushed
+# to the owner's "jobs_<user id>" Channels group (ws/jobs/), and the
+# status endpoint serves the same payload for polling clients.
+
+import time
+from datetime import timedelta
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import close_old_connections
+from django.db.models import F
+from django.urls import reverse
+from django.utils import timezone
+from ..models import Job
+from .compatibility import compatibility_report
+from .horoscope import get_daily_horoscope, DEFAULT_LOCALE
+from .tarot import get_ai_interpretation
+
+MAX_ATTEMPTS = 2
+# A running job this old belonged to a worker that died; it is queued again
+STALE_AFTER = timedelta(minutes=10)
+CLAIM_BATCH = 10
+
+HANDLERS = {}
+
+def job_handler(kind):
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+@job_handler("compatibility")
+def _compatibility(person1, person2):
+    text = compatibility_report(person1, person2)
+    if text is None:
+        raise RuntimeError("Compatibility report failed")
+    return {"text": text}
+
+@job_handler("tarot")
+def _tarot(spread, spread_type):
+    return {"interpretation": get_ai_interpretation(spread, spread_type=spread_type)}
+
+@job_handler("horoscope")
+def _horoscope(sign, locale=DEFAULT_LOCALE):
+    return {"sign": sign, "horoscope": get_daily_horoscope(sign, locale)}
+
+def wants_async(request, data=None):
+    """True for ?async=1 or a truthy "async" field in the request body."""
+    if request.GET.get("async") in ("1", "true"):
+        return True
+    value = (data or {}).get("async")
+    return value is True or str(value).lower() in ("1", "true")
+
+def enqueue(kind, params, user=None):
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    return Job.objects.create(kind=kind, params=params, user=user if user and user.is_authenticated else None)
+
+def job_group(user_id):
+    return f"jobs_{user_id}"
+
+def job_payload(job):
+    return {
+        "id": job.pk,
+        "kind": job.kind,
+        "status": job.status,
+        "result": job.result,
+        "error": job.error or None,
+        "status_url": reverse("api-job-status", args=[job.pk]),
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+def notify(job):
+    """Push the job's payload to its owner's sockets; a missing layer only costs the push."""
+    layer = get_channel_layer()
+    if layer is None or job.user_id is None:
+        return
+    try:
+        async_to_sync(layer.group_send)(job_group(job.user_id), {"type": "job.update", "job": job_payload(job)})
+    except Exception as e:
+        print(f"Job {job.pk} notify failed: {e}")
+
+def claim_next():
+    """Mark the oldest queued job running and return it, or None."""
+    for pk in Job.objects.filter(status=Job.QUEUED).order_by("created_at").values_list("pk", flat=True)[:CLAIM_BATCH]:
+        claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, started_at=timezone.now(), attempts=F("attempts") + 1)
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+def run_job(job):
+    try:
+        job.result = HANDLERS[job.kind](**job.params)
+        job.status = Job.DONE
+        job.error = ""
+    except Exception as e:
+        print(f"Job {job.pk} ({job.kind}) failed: {e}")
+        job.error = str(e)
+        job.status = Job.QUEUED if job.attempts < MAX_ATTEMPTS else Job.FAILED
+    if job.status != Job.QUEUED:
+        job.finished_at = timezone.now()
+    job.save(update_fields=["result", "status", "error", "finished_at"])
+    if job.status != Job.QUEUED:
+        notify(job)
+    return job
+
+def requeue_stale():
+    """
+    Queue running jobs whose worker died again. Their attempt was counted
+    when they were claimed, so one that has used up MAX_ATTEMPTS is marked
+    failed instead. Returns the number queued again.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(status=Job.RUNNING, started_at__lt=now - STALE_AFTER)
+    for job in stale.filter(attempts__gte=MAX_ATTEMPTS):
+        job.status, job.error, job.finished_at = Job.FAILED, "Worker stopped while running the job", now
+        if Job.objects.filter(pk=job.pk, status=Job.RUNNING).update(
+                status=job.status, error=job.error, finished_at=job.finished_at):
+            notify(job)
+    return stale.filter(attempts__lt=MAX_ATTEMPTS).update(status=Job.QUEUED)
+
+def work(poll_interval=1.0, max_jobs=None):
+    """Worker loop: run queued jobs, sleeping poll_interval when there are none."""
+    done = 0
+    last_sweep = 0.0
+    while max_jobs is None or done < max_jobs:
+        close_old_connections()
+        if time.monotonic() - last_sweep > 60:
+            requeue_stale()
+            last_sweep = time.monotonic()
+        job = claim_next()
+        if job is None:
+            if max_jobs is not None:
+                return done
+            time.sleep(poll_interval)
+            continue
+        run_job(job)
+        done += 1
+    return done
+
+def delete_finished_jobs(max_age=timedelta(days=7)):
+    return Job.objects.filter(status__in=[Job.DONE, Job.FAILED],
+                              finished_at__lt=timezone.now() - max_age).delete()[0]
@@ -1,7 +1,12 @@
 import swisseph as swe
 from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.patches import Polygon
 import io, base64
+from django.core.cache import cache
+from .chart_svg import HOUSE_POINTS, HOUSE_CENTERS, north_indian_svg, svg_to_png
+from .chart_cache import cached_chart, chart_url
+from .ephemeris import compute_positions, PLANET_INDEX
 
 SIGNS = ["Aries","Taurus","Gemini","Cancer","Leo","Virgo",
          "Libra","Scorpio","Sagittarius","Capricorn","Aquarius","Pisces"]
@@ -275,13 +280,6 @@ def get_yoga(sun_deg, moon_deg):
     yoga_num = int(((sun_deg + moon_deg) % 360) // (360/27))
     return YOGAS[yoga_num]
 
-# Retrograde check
-def is_retrograde(jd, planet_id):
-    flag = swe.FLG_SIDEREAL
-    xx, ret = swe.calc_ut(jd, planet_id, flag)
-    speed = xx[3]
-    return speed < 0
-
 # Combustion check (Planet close to Sun)
 def is_combust(planet_deg, sun_deg, orb=8):
     diff = abs((planet_deg - sun_deg + 180) % 360 - 180)  # shortest distance
@@ -370,66 +368,24 @@ def get_navamsa_chart(jd, planet_positions, asc_deg):
         "nav_house_signs": nav_house_signs
     }
 
+def navamsa_chart_labels(navamsa_data):
+    house_signs = navamsa_data["nav_house_signs"]
+    house_planets = navamsa_data["nav_house_planets"]
+    sign_nums = {h: NUM_LIST[house_signs[h]] for h in house_signs}
+    lines = {h: [PLANET_ABBR[pl] for pl in pls] for h, pls in house_planets.items() if pls}
+    return sign_nums, lines
+
+def draw_navamsa_svg(navamsa_data):
+    """North Indian style Navamsa (D9) chart as an SVG string."""
+    return north_indian_svg(*navamsa_chart_labels(navamsa_data))
+
 def draw_navamsa_chart(navamsa_data):
     """
     Draw North Indian style Navamsa (D9) chart.
     navamsa_data = dict returned by get_navamsa_chart()
+    Returns base64 PNG.
     """
-
-    house_points = {
-        1: [(100,75), (200,150), (300,75), (200,0)],
-        2: [(0,0), (100,75), (200,0)],
-        3: [(0,0), (0,150), (100,75)],
-        4: [(0,150), (100,225), (200,150), (100,75)],
-        5: [(0,150), (0,300), (100,225)],
-        6: [(100,225), (0,300), (200,300)],
-        7: [(100,225), (200,300), (300,225), (200,150)],
-        8: [(300,225), (200,300), (400,300)],
-        9: [(300,225), (400,300), (400,150)],
-        10: [(300,75), (200,150), (300,225), (400,150)],
-        11: [(300,75), (400,150), (400,0)],
-        12: [(200,0), (300,75), (400,0)]
-    }
-
-    fig, ax = plt.subplots(figsize=(8, 6))
-    ax.set_xlim(0, 400)
-    ax.set_ylim(300, 0)  # invert y-axis
-    ax.axis("off")
-
-    house_signs = navamsa_data["nav_house_signs"]
-    house_planets = navamsa_data["nav_house_planets"]
-
-    # Draw houses
-    for house, points in house_points.items():
-        polygon = plt.Polygon(points, closed=True, fill=None, edgecolor='black', lw=2)
-        ax.add_patch(polygon)
-
-        # House center
-        x_coords = [p[0] for p in points]
-        y_coords = [p[1] for p in points]
-        center_x = sum(x_coords) / len(x_coords)
-        center_y = sum(y_coords) / len(y_coords)
-
-        # Sign abbr + number
-        sign_abbr = house_signs[house]
-        # ax.text(center_x, center_y - 15, sign_abbr, ha="center", va="center", fontsize=10, color="green")
-        ax.text(center_x, center_y +20, NUM_LIST[sign_abbr], ha="center", va="center", fontsize=10, color="orange")
-
-        # Planets
-        if house_planets.get(house):
-            text = "\n".join([PLANET_ABBR[pl] for pl in house_planets[house]])
-            ax.text(center_x, center_y + 10, text, ha="center", va="center", fontsize=9, color="blue")
-
-    plt.tight_layout()
-
-    # Save to base64
-    buf = io.BytesIO()
-    plt.savefig(buf, format="png")
-    buf.seek(0)
-    nav_chart_b64 = base64.b64encode(buf.read()).decode("utf-8")
-    plt.close()
-
-    return nav_chart_b64
+    return _chart_png_b64(*navamsa_chart_labels(navamsa_data))
 
 def get_ascendant_details(asc_deg,moon_deg):
     # Get cusp data (Lagna = cusp[1])
@@ -474,7 +430,65 @@ def assign_house_to_planets(planet_positions, house_planets):
                 planet_positions[pl]["house"] = house_num
     return planet_positions
 
-def get_kundali_chart(year, month, day, hour, minute, lat, lon, tz_offset):
+def kundali_chart_labels(house_signs, house_planets, planet_positions):
+    sign_nums = {h: NUM_LIST[house_signs[h]] for h in house_signs}
+    # Planets with abbreviations and degrees within sign
+    lines = {
+        h: [f"{PLANET_ABBR[pl]} {(planet_positions[pl]['deg'] % 30):.2f}°" for pl in pls]
+        for h, pls in house_planets.items() if pls
+    }
+    return sign_nums, lines
+
+def draw_kundali_svg(house_signs, house_planets, planet_positions):
+    """North Indian style Rasi (D1) chart as an SVG string."""
+    return north_indian_svg(*kundali_chart_labels(house_signs, house_planets, planet_positions))
+
+def draw_kundali_chart(house_signs, house_planets, planet_positions):
+    """
+    Draw North Indian style Rasi (D1) chart.
+    Arguments are the matching keys of the dict returned by compute_kundali().
+    Returns base64 PNG.
+    """
+    return _chart_png_b64(*kundali_chart_labels(house_signs, house_planets, planet_positions))
+
+def _chart_png_b64(sign_nums, lines):
+    return base64.b64encode(_chart_png(sign_nums, lines)).decode('utf-8')
+
+def _chart_png(sign_nums, lines):
+    """
+    PNG of a North Indian chart. Rasterizes the SVG when cairosvg is
+    available, otherwise draws it with a standalone matplotlib Figure
+    (no pyplot global state).
+    """
+    png = svg_to_png(north_indian_svg(sign_nums, lines))
+    if png is None:
+        fig = Figure(figsize=(8, 6))
+        ax = fig.add_subplot()
+        ax.set_xlim(0, 400)
+        ax.set_ylim(300, 0)  # Invert y-axis to match SVG coordinate system
+        ax.axis("off")
+        for house, points in HOUSE_POINTS.items():
+            ax.add_patch(Polygon(points, closed=True, fill=None, edgecolor='black', lw=2))
+            center_x, center_y = HOUSE_CENTERS[house]
+            ax.text(center_x, center_y + 20, sign_nums[house], ha='center', va='center', fontsize=10, color='orange')
+            if lines.get(house):
+                ax.text(center_x, center_y + 10, "\n".join(lines[house]), ha='center', va='center', fontsize=9, color='blue')
+        fig.tight_layout()
+        buf = io.BytesIO()
+        fig.savefig(buf, format='png')
+        png = buf.getvalue()
+    return png
+
+def _chart_bytes(labels, fmt):
+    if fmt == "svg":
+        return north_indian_svg(*labels).encode("utf-8")
+    return _chart_png(*labels)
+
+def compute_kundali(year, month, day, hour, minute, lat, lon, tz_offset):
+    """
+    Structured birth chart (planets, houses, avakhada, navamsa) without any
+    rendering. Cheap enough for JSON-only API clients.
+    """
     # Set sidereal mode (Lahiri ayanamsa)
     swe.set_sid_mode(swe.SIDM_LAHIRI)
 
@@ -490,15 +504,11 @@ def get_kundali_chart(year, month, day, hour, minute, lat, lon, tz_offset):
     # Determine Ascendant sign
     asc_sign_index = int(asc_deg // 30)
 
-    # Planet positions (sidereal)
+    # Planet positions (sidereal), one ephemeris pass for all bodies
+    positions = compute_positions(jd)
     planet_positions = {}
     for pl in PLANETS:
-        if pl == "Rahu":
-            deg = swe.calc_ut(jd, swe.MEAN_NODE, swe.FLG_SIDEREAL)[0][0]
-        elif pl == "Ketu":
-            deg = (swe.calc_ut(jd, swe.MEAN_NODE, swe.FLG_SIDEREAL)[0][0] + 180) % 360
-        else:
-            deg = swe.calc_ut(jd, getattr(swe, pl.upper()), swe.FLG_SIDEREAL)[0][0]
+        deg = float(positions["lon"][PLANET_INDEX[pl]])
         sign_index = int(deg // 30)
         deg_in_sign = deg % 30
         nak, pada = get_nakshatra_pada(deg)
@@ -510,7 +520,7 @@ def get_kundali_chart(year, month, day, hour, minute, lat, lon, tz_offset):
         retro = False
         combust = False
         if pl not in ["Rahu", "Ketu", "Sun"]:
-            retro = is_retrograde(jd, getattr(swe, pl.upper()))
+            retro = bool(positions["speed"][PLANET_INDEX[pl]] < 0)
             combust = is_combust(deg, planet_positions.get("Sun", {}).get("deg", deg), orb=8)
         elif pl in ["Rahu", "Ketu"]:
             retro = True
@@ -549,56 +559,6 @@ def get_kundali_chart(year, month, day, hour, minute, lat, lon, tz_offset):
         house_index = (asc_sign_index + i) % 12
         house_signs[i+1] = SIGN_ABBR[house_index]
 
-    # Define polygon points for each house in North Indian style, counter-clockwise
-    house_points = {
-        1: [(100,75), (200,150), (300,75), (200,0)],  # Top diamond (House 1)
-        2: [(0,0), (100,75), (200,0)],  # Top-left upper triangle (formerly 12)
-        3: [(0,0), (0,150), (100,75)],  # Top-left lower triangle (formerly 11)
-        4: [(0,150), (100,225), (200,150), (100,75)],  # Left diamond (formerly 10)
-        5: [(0,150), (0,300), (100,225)],  # Bottom-left upper triangle (formerly 9)
-        6: [(100,225), (0,300), (200,300)],  # Bottom-left lower triangle (formerly 8)
-        7: [(100,225), (200,300), (300,225), (200,150)],  # Bottom diamond (House 7)
-        8: [(300,225), (200,300), (400,300)],  # Bottom-right lower triangle (formerly 6)
-        9: [(300,225), (400,300), (400,150)],  # Bottom-right upper triangle (formerly 5)
-        10: [(300,75), (200,150), (300,225), (400,150)],  # Right diamond (formerly 4)
-        11: [(300,75), (400,150), (400,0)],  # Top-right lower triangle (formerly 3)
-        12: [(200,0), (300,75), (400,0)]  # Top-right upper triangle (formerly 2)
-    }
-
-    fig, ax = plt.subplots(figsize=(8, 6))
-    ax.set_xlim(0, 400)
-    ax.set_ylim(300, 0)  # Invert y-axis to match SVG coordinate system
-    ax.axis("off")
-
-    # Draw house polygons
-    for house, points in house_points.items():
-        polygon = plt.Polygon(points, closed=True, fill=None, edgecolor='black', lw=2)
-        ax.add_patch(polygon)
-
-        # Calculate center for text placement
-        x_coords = [p[0] for p in points]
-        y_coords = [p[1] for p in points]
-        center_x = sum(x_coords) / len(x_coords)
-        center_y = sum(y_coords) / len(y_coords)
-
-        # House sign abbr
-        # ax.text(center_x, center_y - 10, house_signs[house], ha='center', va='center', fontsize=10, color='green')
-        ax.text(center_x, center_y +20, NUM_LIST[house_signs[house]], ha='center', va='center', fontsize=10, color='orange')
-
-        # Planets with abbreviations and degrees within sign
-        if house_planets.get(house):
-            text = "\n".join([f"{PLANET_ABBR[pl]} {(planet_positions[pl]['deg'] % 30):.2f}°" for pl in house_planets[house]])
-            ax.text(center_x, center_y + 10, text, ha='center', va='center', fontsize=9, color='blue')
-
-    plt.tight_layout()
-
-    # Save chart to base64
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png')
-    buf.seek(0)
-    kundali_chart = base64.b64encode(buf.read()).decode('utf-8')
-    plt.close()
-    
     # Avakhada details
     sun_deg = planet_positions["Sun"]["deg"]
     moon_deg = planet_positions["Moon"]["deg"]
@@ -667,7 +627,6 @@ def get_kundali_chart(year, month, day, hour, minute, lat, lon, tz_offset):
     }
     
     navamsa = get_navamsa_chart(jd, planet_positions, asc_deg)
-    navamsa_chart = draw_navamsa_chart(navamsa)
     
     return {
         "ascendant": ascendent,
@@ -675,7 +634,77 @@ def get_kundali_chart(year, month, day, hour, minute, lat, lon, tz_offset):
         "planet_positions": planet_positions,
         "house_planets": house_planets,
         "house_signs": house_signs,
-        "kundali_chart": kundali_chart,
         "avakhada":avakhada,
-        "navamsa_chart":navamsa_chart
-    }
\ No newline at end of file
+        "navamsa":navamsa
+    }
+
+CHART_MIME = {"png": "image/png", "svg": "image/svg+xml"}
+
+def render_kundali_charts(chart, fmt="png"):
+    """
+    Adds the base64 encoded images (kundali_chart, navamsa_chart) to a chart
+    returned by compute_kundali(). fmt is "png" or "svg"; chart_mime tells
+    the client which one it got.
+    """
+    args = (chart["house_signs"], chart["house_planets"], chart["planet_positions"])
+    if fmt == "svg":
+        d1 = draw_kundali_svg(*args).encode("utf-8")
+        d9 = draw_navamsa_svg(chart["navamsa"]).encode("utf-8")
+        chart["kundali_chart"] = base64.b64encode(d1).decode("utf-8")
+        chart["navamsa_chart"] = base64.b64encode(d9).decode("utf-8")
+    else:
+        chart["kundali_chart"] = draw_kundali_chart(*args)
+        chart["navamsa_chart"] = draw_navamsa_chart(chart["navamsa"])
+    chart["chart_mime"] = CHART_MIME[fmt]
+    return chart
+
+def kundali_chart_urls(chart, fmt="png"):
+    """
+    Adds kundali_chart_url / navamsa_chart_url pointing at content-addressed
+    images (see utils.chart_cache); identical charts share one stored image.
+    """
+    d1 = kundali_chart_labels(chart["house_signs"], chart["house_planets"], chart["planet_positions"])
+    d9 = navamsa_chart_labels(chart["navamsa"])
+    kind = f"north-indian.{fmt}"
+    chart["kundali_chart_url"] = chart_url(kind, d1, lambda: _chart_bytes(d1, fmt), CHART_MIME[fmt])
+    chart["navamsa_chart_url"] = chart_url(kind, d9, lambda: _chart_bytes(d9, fmt), CHART_MIME[fmt])
+    return chart
+
+def kundali_chart_image(chart, which="d1", fmt="png"):
+    """
+    (digest, bytes) of the D1 or D9 image, from the same content-addressed
+    store as kundali_chart_urls().
+    """
+    if which == "d9":
+        labels = navamsa_chart_labels(chart["navamsa"])
+    else:
+        labels = kundali_chart_labels(chart["house_signs"], chart["house_planets"], chart["planet_positions"])
+    return cached_chart(f"north-indian.{fmt}", labels, lambda: _chart_bytes(labels, fmt), CHART_MIME[fmt])
+
+# Bump whenever compute_kundali's output changes so cached charts are dropped
+KUNDALI_VERSION = 1
+KUNDALI_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+AYANAMSA = "lahiri"
+
+def kundali_cache_key(year, month, day, hour, minute, lat, lon, tz_offset):
+    return (f"kundali:v{KUNDALI_VERSION}:{AYANAMSA}:{int(year)}-{int(month)}-{int(day)}T{int(hour)}:{int(minute)}"
+            f":{round(float(lat), 4)}:{round(float(lon), 4)}:{round(float(tz_offset), 2)}")
+
+def get_kundali_cached(year, month, day, hour, minute, lat, lon, tz_offset):
+    """
+    compute_kundali() memoized in the default cache, keyed by the rounded
+    birth tuple, ayanamsa and KUNDALI_VERSION.
+    """
+    key = kundali_cache_key(year, month, day, hour, minute, lat, lon, tz_offset)
+    chart = cache.get(key)
+    if chart is None:
+        chart = compute_kundali(int(year), int(month), int(day), int(hour), int(minute),
+                                round(float(lat), 4), round(float(lon), 4), round(float(tz_offset), 2))
+        cache.set(key, chart, KUNDALI_CACHE_TIMEOUT)
+    return chart
+
+def get_kundali_chart(year, month, day, hour, minute, lat, lon, tz_offset, render=True, fmt="png"):
+    chart = get_kundali_cached(year, month, day, hour, minute, lat, lon, tz_offset)
+    if render:
+        chart = render_kundali_charts(chart, fmt)
+    return chart
\ No newline at end of file
@@ -1,11 +1,11 @@
 # Requires: swisseph, geopy, timezonefinder, pytz
 # pip install pyswisseph geopy timezonefinder pytz
 
+import numpy as np
 import swisseph as swe
 from datetime import datetime
-from geopy.geocoders import Nominatim
-from timezonefinderL import TimezoneFinder
 import pytz
+from .geocoding import geocode_place_timezone
 
 # -------------------------
 # Constants
@@ -27,28 +27,6 @@ RASHI_RULER = {
     "Libra":"Venus","Scorpio":"Mars","Sagittarius":"Jupiter","Capricorn":"Saturn","Aquarius":"Saturn","Pisces":"Jupiter"
 }
 
-# -------------------------
-# Geocode + Timezone helper
-# -------------------------
-def geocode_place_timezone(place_name: str, user_agent="astro_ai_app", timeout=10):
-    """
-    Returns (lat, lon, tzinfo) or (None, None, None) if geocoding fails.
-    """
-    try:
-        geolocator = Nominatim(user_agent=user_agent, timeout=timeout)
-        loc = geolocator.geocode(place_name)
-        if not loc:
-            return None, None, None
-        lat, lon = float(loc.latitude), float(loc.longitude)
-        tf = TimezoneFinder()
-        tzname = tf.timezone_at(lng=lon, lat=lat)
-        if tzname:
-            tz = pytz.timezone(tzname)
-            return lat, lon, tz
-    except Exception:
-        return None, None, None
-    return None, None, None
-
 # -------------------------
 # Astronomy helpers
 # -------------------------
@@ -139,7 +117,6 @@ NAK_TO_YONI = [
 def yoni_kuta_score(nak1_idx, nak2_idx):
     y1 = NAK_TO_YONI[nak1_idx]
     y2 = NAK_TO_YONI[nak2_idx]
-    print(y1,y2)
     return float(YONI_SCORE.get(y1, {}).get(y2, 0.0))
 
 # 3) Full Graha Maitri table (0..5)
@@ -217,9 +194,8 @@ def tara_kuta_score(nak1, nak2):
         return 1.5
     return 0.0
 
-def gana_kuta_score(nak1, nak2):
-    GANA_OF_NAKSHATRA = {
-        "Ashwini": "Deva", "Mrigashira": "Deva", "Punarvasu": "Deva",
+GANA_OF_NAKSHATRA = {
+    "Ashwini": "Deva", "Mrigashira": "Deva", "Punarvasu": "Deva",
     "Pushya": "Deva", "Hasta": "Deva", "Swati": "Deva",
     "Anuradha": "Deva", "Shravana": "Deva", "Revati": "Deva",
 
@@ -231,7 +207,9 @@ def gana_kuta_score(nak1, nak2):
     "Krittika": "Rakshasa", "Magha": "Rakshasa", "Purva Phalguni": "Rakshasa",
     "Vishakha": "Rakshasa", "Jyeshta": "Rakshasa", "Mula": "Rakshasa",
     "Purva Ashadha": "Rakshasa", "Shatabhisha": "Rakshasa"
-    }
+}
+
+def gana_kuta_score(nak1, nak2):
     g1 = GANA_OF_NAKSHATRA.get(nak1)
     g2 = GANA_OF_NAKSHATRA.get(nak2)
     if g1 == g2:
@@ -260,117 +238,166 @@ def nadi_kuta_score(nak1, nak2):
     n2 = NADIS[nak2]
     return 0.0 if n1 == n2 else 8.0
 
+# -------------------------
+# Ashtakoota lookup table
+# -------------------------
+# Every kuta depends only on the two Moon nakshatras (27) and rashis (12),
+# so a "moon state" is nak_idx * 12 + rashi_idx (324 states) and the whole
+# breakdown for a pair of states is one row of KUTA_TABLE. Built at import
+# from the kuta functions above, so they stay the single source of truth.
+KUTAS = [
+    ("Varna", 1.0), ("Vashya", 2.0), ("Tara", 3.0), ("Yoni", 4.0),
+    ("Graha Maitri", 5.0), ("Gana", 6.0), ("Bhakoot", 7.0), ("Nadi", 8.0),
+]
+KUTA_MAX = np.array([mx for _, mx in KUTAS])
+N_STATES = 27 * 12
+
+def moon_state(nak_idx, rashi_idx):
+    return nak_idx * 12 + rashi_idx
+
+def _build_kuta_table():
+    naks, rashis = range(27), range(12)
+    def nak_table(fn):
+        return np.array([[fn(a, b) for b in naks] for a in naks])
+    def rashi_table(fn):
+        return np.array([[fn(a, b) for b in rashis] for a in rashis])
+    by_name = lambda fn: (lambda a, b: fn(SIGNS[a], SIGNS[b]))
+    small = [
+        ("rashi", rashi_table(by_name(varna_kuta_score))),
+        ("nak", nak_table(vashya_kuta_score_from_nakshatra)),
+        ("nak", nak_table(tara_kuta_score)),
+        ("nak", nak_table(yoni_kuta_score)),
+        ("rashi", rashi_table(by_name(graha_maitri_score))),
+        ("nak", nak_table(gana_kuta_score)),
+        ("rashi", rashi_table(bhakoot_kuta_score)),
+        ("nak", nak_table(nadi_kuta_score)),
+    ]
+    states = np.arange(N_STATES)
+    index = {"nak": states // 12, "rashi": states % 12}
+    table = np.empty((N_STATES, N_STATES, len(KUTAS)), dtype=np.float32)
+    for k, (kind, t) in enumerate(small):
+        i = index[kind]
+        table[:, :, k] = np.clip(t[i[:, None], i[None, :]], 0.0, KUTA_MAX[k])
+    return table
+
+KUTA_TABLE = _build_kuta_table()                 # (324, 324, 8)
+TOTAL_TABLE = KUTA_TABLE.sum(axis=2)             # (324, 324)
+
+def ashtakoota_breakdown(state1, state2):
+    """{kuta: {"score", "max"}} and the total for two moon states."""
+    row = KUTA_TABLE[state1, state2]
+    breakdown = {name: {"score": float(row[k]), "max": mx} for k, (name, mx) in enumerate(KUTAS)}
+    return breakdown, float(TOTAL_TABLE[state1, state2])
+
 # -------------------------
 # Main matching routine
 # -------------------------
 # (Assumes the previous full implementation is present: imports, constants, helper tables,
 #  and helper functions like sidereal_longitude, nakshatra_from_deg, etc.)
 
+MANGAL_HOUSES = {1, 2, 4, 7, 8, 12}
+
+def _extract_latlon_tz(d):
+    """lat/lon/tz for a birth record, geocoding 'Place' unless given."""
+    if d.get('lat') is not None and d.get('lon') is not None and d.get('timezone'):
+        return float(d['lat']), float(d['lon']), d['timezone']
+    lat, lon, tz = geocode_place_timezone(d.get('Place'))
+    if lat is None:
+        raise ValueError(f"Could not geocode place: {d.get('Place')}")
+    return lat, lon, tz
+
+def local_to_jd_ut(local_dt, tz):
+    """Julian day (UT) of a naive local datetime in pytz zone tz."""
+    aware = tz.localize(local_dt)
+    utc_dt = aware.astimezone(pytz.utc)
+    return swe.julday(utc_dt.year, utc_dt.month, utc_dt.day,
+                      utc_dt.hour + utc_dt.minute / 60.0 + utc_dt.second / 3600.0)
+
+def _to_jd_ut(date_str, time_str, tz):
+    Y, M, D = [int(x) for x in date_str.split("-")]
+    hh, mm = [int(x) for x in time_str.split(":")]
+    return local_to_jd_ut(datetime(Y, M, D, hh, mm), tz)
+
+def _house_number_of_deg(deg, asc_deg):
+    # returns 1..12
+    house_num = int(((deg - asc_deg + 360) % 360) // 30) + 1
+    if house_num > 12:
+        house_num -= 12
+    return house_num
+
+def moon_chart_at(jd, lat, lon, use_sidereal=True):
+    """
+    Everything matching needs from one chart: Moon rashi/nakshatra/pada,
+    ascendant and Mars house.
+    """
+    asc, _ = swe.houses(jd, lat, lon, b'A')
+    asc_deg = asc[0]
+    moon_lon = sidereal_longitude(swe.MOON, jd) if use_sidereal else swe.calc_ut(jd, swe.MOON)[0][0]
+    mars_lon = sidereal_longitude(swe.MARS, jd) if use_sidereal else swe.calc_ut(jd, swe.MARS)[0][0]
+    nak_idx, pada = nakshatra_from_deg(moon_lon)
+    return {
+        "rashi_index": rashi_from_deg(moon_lon),
+        "nakshatra_index": nak_idx,
+        "pada": pada,
+        "moon_lon": moon_lon,
+        "asc_deg": asc_deg,
+        "mars_lon": mars_lon,
+        "mars_house": _house_number_of_deg(mars_lon, asc_deg),
+    }
+
+def moon_chart(birth_data, use_sidereal=True):
+    """moon_chart_at() for a {'Date', 'Time', 'Place' | 'lat'/'lon'/'timezone'} record."""
+    lat, lon, tz = _extract_latlon_tz(birth_data)
+    jd = _to_jd_ut(birth_data['Date'], birth_data['Time'], tz)
+    return moon_chart_at(jd, lat, lon, use_sidereal)
+
+def match_status(total_score):
+    if total_score >= 32:
+        return "Best Match"
+    elif total_score >= 24:
+        return "Very Good Match"
+    elif total_score >= 18:
+        return "Good Match"
+    elif total_score >= 10:
+        return "Average Match"
+    return "Poor Match"
+
 def perform_kundali_matching(p1_birth_data, p2_birth_data, use_sidereal=True):
     """
     Extended perform_kundali_matching that returns Ashtakoota breakdown plus additional predictions.
     Input format same as before.
     """
-    # Helper to get lat/lon/tz
-    def extract_latlon_tz(d):
-        if d.get('lat') is not None and d.get('lon') is not None and d.get('timezone'):
-            return float(d['lat']), float(d['lon']), d['timezone']
-        lat, lon, tz = geocode_place_timezone(d.get('Place'))
-        if lat is None:
-            raise ValueError(f"Could not geocode place: {d.get('Place')}")
-        return lat, lon, tz
-
-    lat1, lon1, tz1 = extract_latlon_tz(p1_birth_data)
-    lat2, lon2, tz2 = extract_latlon_tz(p2_birth_data)
-
-    # Convert local date/time to Julian day UT
-    def to_jd_ut(date_str, time_str, tz):
-        Y, M, D = [int(x) for x in date_str.split("-")]
-        hh, mm = [int(x) for x in time_str.split(":")]
-        local_dt = datetime(Y, M, D, hh, mm)
-        aware = tz.localize(local_dt)
-        utc_dt = aware.astimezone(pytz.utc)
-        jd = swe.julday(utc_dt.year, utc_dt.month, utc_dt.day,
-                        utc_dt.hour + utc_dt.minute / 60.0 + utc_dt.second / 3600.0)
-        return jd
-
-    jd1 = to_jd_ut(p1_birth_data['Date'], p1_birth_data['Time'], tz1)
-    jd2 = to_jd_ut(p2_birth_data['Date'], p2_birth_data['Time'], tz2)
-
-    # compute ascendant degrees for house-based checks (needs lat/lon)
-    asc1, cusps1 = swe.houses(jd1, lat1, lon1, b'A')
-    asc2, cusps2 = swe.houses(jd2, lat2, lon2, b'A')
-    asc1_deg = asc1[0]
-    asc2_deg = asc2[0]
-
-    # Compute sidereal moon longitudes (for kuta calculations)
-    moon1_lon = sidereal_longitude(swe.MOON, jd1) if use_sidereal else swe.calc_ut(jd1, swe.MOON)[0][0]
-    moon2_lon = sidereal_longitude(swe.MOON, jd2) if use_sidereal else swe.calc_ut(jd2, swe.MOON)[0][0]
-
-    # Rashi / Nakshatra / Pada
-    r1_idx = rashi_from_deg(moon1_lon)
-    r2_idx = rashi_from_deg(moon2_lon)
+    return matching_from_charts(moon_chart(p1_birth_data, use_sidereal), moon_chart(p2_birth_data, use_sidereal))
+
+def matching_from_charts(c1, c2):
+    """perform_kundali_matching() on two precomputed moon_chart() results."""
+    r1_idx, r2_idx = c1["rashi_index"], c2["rashi_index"]
     r1_name = SIGNS[r1_idx]
     r2_name = SIGNS[r2_idx]
-    nak1_idx, pada1 = nakshatra_from_deg(moon1_lon)
-    nak2_idx, pada2 = nakshatra_from_deg(moon2_lon)
+    nak1_idx, pada1 = c1["nakshatra_index"], c1["pada"]
+    nak2_idx, pada2 = c2["nakshatra_index"], c2["pada"]
     nak1_name = NAKSHATRAS[nak1_idx]
     nak2_name = NAKSHATRAS[nak2_idx]
+    moon1_lon, moon2_lon = c1["moon_lon"], c2["moon_lon"]
+    asc1_deg, asc2_deg = c1["asc_deg"], c2["asc_deg"]
 
-    # Compute kuta scores (use the improved functions defined earlier)
-    scores = {}
-    scores['Varna'] = (varna_kuta_score(r1_name, r2_name), 1.0)
-    scores['Vashya'] = (vashya_kuta_score_from_nakshatra(nak1_idx, nak2_idx), 2.0)
-    scores['Tara']  = (tara_kuta_score(nak1_idx, nak2_idx), 3.0)
-    scores['Yoni']  = (yoni_kuta_score(nak1_idx, nak2_idx), 4.0)
-    scores['Graha Maitri'] = (graha_maitri_score(r1_name, r2_name), 5.0)
-    scores['Gana']  = (gana_kuta_score(nak1_idx, nak2_idx), 6.0)
-    scores['Bhakoot'] = (bhakoot_kuta_score(r1_idx, r2_idx), 7.0)
-    scores['Nadi']  = (nadi_kuta_score(nak1_idx, nak2_idx), 8.0)
-
-    # Normalize/clip each score to its max and build breakdown
-    total_score = 0.0
-    total_possible = 0.0
-    breakdown = {}
-    for k, (val, mx) in scores.items():
-        clipped = float(max(0.0, min(val, mx)))
-        breakdown[k] = {"score": clipped, "max": float(mx)}
-        total_score += clipped
-        total_possible += float(mx)
+    # Kuta scores: one lookup in the precomputed table
+    breakdown, total_score = ashtakoota_breakdown(moon_state(nak1_idx, r1_idx), moon_state(nak2_idx, r2_idx))
+    total_possible = float(KUTA_MAX.sum())
 
     # Determine match status
-    if total_score >= 32:
-        status = "Best Match"
-    elif total_score >= 24:
-        status = "Very Good Match"
-    elif total_score >= 18:
-        status = "Good Match"
-    elif total_score >= 10:
-        status = "Average Match"
-    else:
-        status = "Poor Match"
+    status = match_status(total_score)
 
     # -------------------------
     # Additional predictions
     # -------------------------
-    # Helpers for house calculation
-    def house_number_of_deg(deg, asc_deg):
-        # returns 1..12
-        house_num = int(((deg - asc_deg + 360) % 360) // 30) + 1
-        if house_num > 12:
-            house_num -= 12
-        return house_num
-
-    # Compute Mars sidereal longitudes and house placement for both persons
-    mars1_lon = sidereal_longitude(swe.MARS, jd1) if use_sidereal else swe.calc_ut(jd1, swe.MARS)[0][0]
-    mars2_lon = sidereal_longitude(swe.MARS, jd2) if use_sidereal else swe.calc_ut(jd2, swe.MARS)[0][0]
-    mars1_house = house_number_of_deg(mars1_lon, asc1_deg)
-    mars2_house = house_number_of_deg(mars2_lon, asc2_deg)
+    mars1_lon, mars2_lon = c1["mars_lon"], c2["mars_lon"]
+    mars1_house, mars2_house = c1["mars_house"], c2["mars_house"]
 
     additional_predictions = []
 
     # Mangal Dosha: common rule - Mars in houses 1,2,4,7,8,12 => Manglik
-    mangal_houses = {1,2,4,7,8,12}
+    mangal_houses = MANGAL_HOUSES
     for i, (name, mars_house) in enumerate([("Person 1", mars1_house), ("Person 2", mars2_house)], start=1):
         if mars_house in mangal_houses:
             additional_predictions.append({
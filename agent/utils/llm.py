@@ -0,0 +1,172 @@
+# Shared LLM gateway.
+# One AsyncAzureOpenAI client, with a pooled httpx connection pool, lives on
+# a single background event loop owned by this module. Every call from a
+# sync view (WSGI thread) or an async consumer (Channels loop) is scheduled
+# onto that loop, so connections are reused across requests and a semaphore
+# bounds how many completions are in flight at once. Each call gets a
+# timeout; once it expires the caller stops waiting instead of holding a
+# worker until the upstream gives up.
+
+import asyncio
+import os
+import queue
+import threading
+from concurrent import futures
+import httpx
+from django.conf import settings
+from dotenv import load_dotenv
+from openai import AsyncAzureOpenAI
+
+load_dotenv()
+
+DEFAULT_MODEL = "gpt-4o-mini"
+DEFAULT_TEMPERATURE = 0.7
+API_VERSION = "2024-05-01-preview"
+DEFAULT_ENDPOINT = "https://jivihireopenai.openai.azure.com/"
+_DONE = object()
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+class LLMGateway:
+    """
+    Owns the event loop thread, the async client and the concurrency
+    semaphore. Use the module-level complete()/acomplete() helpers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+        self._client = None
+        self._semaphore = None
+
+    def _start(self):
+        with self._lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="llm-gateway", daemon=True).start()
+            asyncio.run_coroutine_threadsafe(self._init_client(), loop).result()
+            self._loop = loop
+
+    async def _init_client(self):
+        # Created on the gateway loop: the httpx pool and the semaphore
+        # belong to the loop they are first used on.
+        limits = httpx.Limits(max_connections=_setting("LLM_MAX_CONNECTIONS", 20),
+                              max_keepalive_connections=_setting("LLM_MAX_KEEPALIVE", 10))
+        timeout = httpx.Timeout(_setting("LLM_TIMEOUT", 60.0), connect=_setting("LLM_CONNECT_TIMEOUT", 5.0))
+        self._client = AsyncAzureOpenAI(
+            azure_endpoint=os.getenv("ENDPOINT_URL", DEFAULT_ENDPOINT),
+            api_key=os.environ['OPENAI_API_KEY'],
+            api_version=API_VERSION,
+            max_retries=_setting("LLM_MAX_RETRIES", 2),
+            timeout=timeout,
+            http_client=httpx.AsyncClient(limits=limits, timeout=timeout),
+        )
+        self._semaphore = asyncio.Semaphore(_setting("LLM_MAX_CONCURRENCY", 8))
+
+    async def _complete(self, messages, model, temperature, timeout):
+        async with self._semaphore:
+            response = await self._client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                timeout=timeout,
+            )
+        return response.choices[0].message.content.strip()
+
+    async def _stream(self, messages, model, temperature, timeout, put):
+        """Feed each content delta to put(); holds a semaphore slot until the stream ends."""
+        async with self._semaphore:
+            stream = await self._client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                timeout=timeout,
+                stream=True,
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    put(chunk.choices[0].delta.content)
+
+    def submit(self, coro_fn, *args):
+        """Schedule coro_fn(*args) on the gateway loop; returns a concurrent Future."""
+        self._start()
+        return asyncio.run_coroutine_threadsafe(coro_fn(*args), self._loop)
+
+gateway = LLMGateway()
+
+def _args(messages, model, temperature, timeout):
+    return (messages, model or DEFAULT_MODEL,
+            DEFAULT_TEMPERATURE if temperature is None else temperature,
+            timeout or _setting("LLM_TIMEOUT", 60.0))
+
+def complete(messages, model=None, temperature=None, timeout=None):
+    """
+    Reply text for a chat completion, from sync code. Raises TimeoutError
+    if no reply arrives within `timeout` seconds.
+    """
+    args = _args(messages, model, temperature, timeout)
+    future = gateway.submit(gateway._complete, *args)
+    try:
+        return future.result(timeout=args[3])
+    except futures.TimeoutError:
+        future.cancel()
+        raise
+
+async def acomplete(messages, model=None, temperature=None, timeout=None):
+    """complete() for async code (Channels consumers); never blocks the caller's loop."""
+    args = _args(messages, model, temperature, timeout)
+    future = gateway.submit(gateway._complete, *args)
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), args[3])
+    except asyncio.TimeoutError:
+        future.cancel()
+        raise
+
+def ask(prompt, system=None, **kwargs):
+    """complete() for a single user prompt with an optional system message."""
+    messages = [{"role": "system", "content": system}] if system else []
+    messages.append({"role": "user", "content": prompt})
+    return complete(messages, **kwargs)
+
+def stream_chat(messages, model=None, temperature=None, timeout=None):
+    """
+    Yield reply deltas as they are generated, from sync code. `timeout`
+    bounds the wait for each delta; closing the generator early cancels
+    the upstream request.
+    """
+    args = _args(messages, model, temperature, timeout)
+    deltas = queue.Queue()
+    future = gateway.submit(gateway._stream, *args, deltas.put)
+    future.add_done_callback(lambda f: deltas.put(_DONE))
+    try:
+        while True:
+            try:
+                item = deltas.get(timeout=args[3])
+            except queue.Empty:
+                raise futures.TimeoutError()
+            if item is _DONE:
+                future.result()
+                return
+            yield item
+    finally:
+        future.cancel()
+
+async def astream_chat(messages, model=None, temperature=None, timeout=None):
+    """stream_chat() for async code: deltas are handed to the caller's loop, which never blocks."""
+    args = _args(messages, model, temperature, timeout)
+    loop = asyncio.get_running_loop()
+    deltas = asyncio.Queue()
+    put = lambda item: loop.call_soon_threadsafe(deltas.put_nowait, item)
+    future = gateway.submit(gateway._stream, *args, put)
+    future.add_done_callback(lambda f: put(_DONE))
+    try:
+        while True:
+            item = await asyncio.wait_for(deltas.get(), args[3])
+            if item is _DONE:
+                future.result()
+                return
+            yield item
+    finally:
+        future.cancel()
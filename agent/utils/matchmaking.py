@@ -0,0 +1,91 @@
+# One-to-many kundali matching.
+# Each profile's Moon nakshatra/rashi and Mars house are copied from its
+# natal snapshot into ProfileMoonIndex (refreshed on profile save,
+# backfilled with `manage.py build_moon_index`), so a search is one query
+# for the candidates and one fancy-index into the Ashtakoota TOTAL_TABLE.
+
+import numpy as np
+from ..models import ProfileMoonIndex
+from .kundali_matching import TOTAL_TABLE, MANGAL_HOUSES, moon_state, match_status
+from .natal import get_natal_snapshot
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+# Taken off the Ashtakoota total (out of 36) when exactly one side is Manglik
+MANGAL_MISMATCH_PENALTY = 6.0
+
+def snapshot_moon_chart(snapshot):
+    """The moon_chart() keys search_matches() needs, from a NatalSnapshot."""
+    return {
+        "nakshatra_index": snapshot.moon_nakshatra,
+        "rashi_index": snapshot.moon_rashi,
+        "mars_house": snapshot.mars_house,
+    }
+
+def profile_moon_chart(profile):
+    """The profile's moon chart from its natal snapshot, or None if birth data is incomplete."""
+    snapshot = get_natal_snapshot(profile)
+    return snapshot_moon_chart(snapshot) if snapshot else None
+
+def index_profile(profile, snapshot=None):
+    """Create/refresh the profile's ProfileMoonIndex row; drop it if birth data is incomplete."""
+    snapshot = snapshot or get_natal_snapshot(profile)
+    if snapshot is None:
+        ProfileMoonIndex.objects.filter(profile=profile).delete()
+        return None
+    row, _ = ProfileMoonIndex.objects.update_or_create(
+        profile=profile,
+        defaults={
+            "nakshatra": snapshot.moon_nakshatra,
+            "rashi": snapshot.moon_rashi,
+            "moon_state": snapshot.moon_state,
+            "mars_house": snapshot.mars_house,
+            "manglik": snapshot.mars_house in MANGAL_HOUSES,
+        },
+    )
+    return row
+
+def search_matches(chart, gender=None, min_score=0.0, limit=DEFAULT_LIMIT, exclude_profile_id=None):
+    """
+    Rank indexed profiles against a moon_chart() result.
+    Returns dicts with the candidate's profile id, name and gender, the
+    Ashtakoota total, Manglik flags and the ranking score, best first.
+    """
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    qs = ProfileMoonIndex.objects.all()
+    if gender:
+        qs = qs.filter(profile__gender=gender)
+    if exclude_profile_id is not None:
+        qs = qs.exclude(profile_id=exclude_profile_id)
+    rows = list(qs.values_list("profile_id", "moon_state", "manglik", "profile__name", "profile__gender"))
+    if not rows:
+        return []
+
+    states = np.fromiter((r[1] for r in rows), dtype=np.intp, count=len(rows))
+    manglik = np.fromiter((r[2] for r in rows), dtype=bool, count=len(rows))
+    seeker_manglik = chart["mars_house"] in MANGAL_HOUSES
+
+    totals = TOTAL_TABLE[moon_state(chart["nakshatra_index"], chart["rashi_index"]), states]
+    mangal_ok = manglik == seeker_manglik
+    rank = totals - np.where(mangal_ok, 0.0, MANGAL_MISMATCH_PENALTY)
+    rank[totals < min_score] = -np.inf
+
+    k = min(limit, len(rows))
+    top = np.argpartition(-rank, k - 1)[:k]
+    top = top[np.argsort(-rank[top], kind="stable")]
+    results = []
+    for i in top:
+        if not np.isfinite(rank[i]):
+            break
+        profile_id, _, is_manglik, name, g = rows[i]
+        results.append({
+            "profile_id": profile_id,
+            "name": name,
+            "gender": g,
+            "total_score": float(totals[i]),
+            "match_status": match_status(float(totals[i])),
+            "manglik": bool(is_manglik),
+            "mangal_compatible": bool(mangal_ok[i]),
+            "rank_score": float(rank[i]),
+        })
+    return results
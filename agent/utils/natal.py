@@ -0,0 +1,164 @@
+# Per-profile natal snapshot.
+# A profile's chart only changes when its birth data or our algorithms do,
+# so it is computed once on save into NatalSnapshot and read back by the
+# views (kundali, chat prompts, matchmaking). A row whose version or
+# birth signature no longer matches is recomputed on first read; after a
+# version bump `manage.py rebuild_natal_snapshots` does them all up front.
+
+from datetime import datetime, date, time, timedelta
+import pytz
+from ..models import NatalSnapshot
+from .kundali import get_kundali_cached, KUNDALI_VERSION, NAKSHATRA_LORDS, NAKSHATRAS, SIGNS
+from .kundali_matching import local_to_jd_ut, moon_chart_at, moon_state
+
+# Bump whenever the snapshot fields or how they are derived change
+NATAL_VERSION = 2
+SNAPSHOT_VERSION = f"{NATAL_VERSION}.{KUNDALI_VERSION}"
+
+VIMSHOTTARI_ORDER = ["Ketu", "Venus", "Sun", "Moon", "Mars", "Rahu", "Jupiter", "Saturn", "Mercury"]
+VIMSHOTTARI_YEARS = {"Ketu": 7, "Venus": 20, "Sun": 6, "Moon": 10, "Mars": 7,
+                     "Rahu": 18, "Jupiter": 16, "Saturn": 19, "Mercury": 17}
+YEAR_DAYS = 365.25
+NAK_SPAN = 360.0 / 27.0
+
+def _birth_datetime(profile):
+    d, t = profile.birth_date, profile.birth_time
+    if isinstance(d, str):
+        d = date.fromisoformat(d)
+    if isinstance(t, str):
+        t = time.fromisoformat(t)
+    return datetime.combine(d, t)
+
+def has_birth_data(profile):
+    return bool(profile.birth_date and profile.birth_time and profile.birth_lat is not None
+                and profile.birth_lng is not None and profile.birth_tz)
+
+def birth_signature(profile):
+    return (f"{_birth_datetime(profile).isoformat()}|{round(float(profile.birth_lat), 4)}"
+            f"|{round(float(profile.birth_lng), 4)}|{profile.birth_tz}")
+
+def offset_at(tz, local_dt):
+    """UTC offset in hours of pytz zone tz at a naive local datetime (DST and historic rules included)."""
+    return float(tz.localize(local_dt).utcoffset().total_seconds() / 3600)
+
+def birth_offset(profile):
+    """UTC offset in hours in force at the birth moment."""
+    return offset_at(pytz.timezone(str(profile.birth_tz)), _birth_datetime(profile))
+
+def profile_kundali_args(profile):
+    """
+    get_kundali_chart() arguments for a profile, with the UTC offset of the
+    birth moment, or None when the birth data is incomplete.
+    """
+    if not has_birth_data(profile):
+        return None
+    dt = _birth_datetime(profile)
+    return dt.year, dt.month, dt.day, dt.hour, dt.minute, profile.birth_lat, profile.birth_lng, birth_offset(profile)
+
+def vimshottari_start(moon_deg, birth_dt):
+    """
+    (lord, start_date, balance_years) of the mahadasha running at birth;
+    start is when it began (before birth), balance how much of it was left.
+    """
+    nak_index = int((moon_deg % 360) // NAK_SPAN)
+    lord = NAKSHATRA_LORDS[nak_index]
+    elapsed = ((moon_deg % 360) % NAK_SPAN) / NAK_SPAN
+    years = VIMSHOTTARI_YEARS[lord]
+    start = birth_dt - timedelta(days=elapsed * years * YEAR_DAYS)
+    return lord, start.date(), (1.0 - elapsed) * years
+
+def current_dasha(snapshot, on=None):
+    """(lord, start, end) dates of the mahadasha running on `on` (default today)."""
+    on = on or date.today()
+    lord, start = snapshot.dasha_lord, snapshot.dasha_start
+    i = VIMSHOTTARI_ORDER.index(lord)
+    while True:
+        end = start + timedelta(days=VIMSHOTTARI_YEARS[lord] * YEAR_DAYS)
+        if on < end:
+            return lord, start, end
+        i = (i + 1) % len(VIMSHOTTARI_ORDER)
+        lord, start = VIMSHOTTARI_ORDER[i], end
+
+def build_snapshot_fields(profile):
+    """NatalSnapshot field values for a profile with complete birth data."""
+    args = profile_kundali_args(profile)
+    kundali = get_kundali_cached(*args)
+    birth_dt = _birth_datetime(profile)
+    # Same offset as the kundali, so both charts are cast for one instant
+    jd = local_to_jd_ut(birth_dt - timedelta(hours=args[-1]), pytz.utc)
+    moon = moon_chart_at(jd, profile.birth_lat, profile.birth_lng)
+    positions = kundali["planet_positions"]
+    lord, start, balance = vimshottari_start(positions["Moon"]["deg"], birth_dt)
+    return {
+        "version": SNAPSHOT_VERSION,
+        "birth_key": birth_signature(profile),
+        "ascendant": kundali["ascendant"]["sign"],
+        "moon_rashi": moon["rashi_index"],
+        "moon_nakshatra": moon["nakshatra_index"],
+        "moon_pada": moon["pada"],
+        "moon_state": moon_state(moon["nakshatra_index"], moon["rashi_index"]),
+        "mars_house": moon["mars_house"],
+        "planets": {pl: info["deg"] for pl, info in positions.items()},
+        "houses": list(kundali["houses"]),
+        "dasha_lord": lord,
+        "dasha_start": start,
+        "dasha_balance_years": balance,
+        "kundali": kundali,
+    }
+
+def refresh_natal_snapshot(profile):
+    """Recompute and store the snapshot; deletes it if the birth data is incomplete."""
+    if not has_birth_data(profile):
+        NatalSnapshot.objects.filter(profile=profile).delete()
+        return None
+    snapshot, _ = NatalSnapshot.objects.update_or_create(profile=profile, defaults=build_snapshot_fields(profile))
+    return snapshot
+
+def get_natal_snapshot(profile):
+    """The profile's snapshot, recomputed first if missing or stale; None without birth data."""
+    if profile is None or not has_birth_data(profile):
+        return None
+    snapshot = NatalSnapshot.objects.filter(profile=profile).first()
+    if snapshot and snapshot.version == SNAPSHOT_VERSION and snapshot.birth_key == birth_signature(profile):
+        return snapshot
+    return refresh_natal_snapshot(profile)
+
+def _int_keys(d):
+    return {int(k): v for k, v in d.items()}
+
+def snapshot_kundali(snapshot):
+    """
+    The stored compute_kundali() result with its house-number keys turned
+    back into ints (JSON stores them as strings).
+    """
+    chart = dict(snapshot.kundali)
+    chart["house_planets"] = _int_keys(chart["house_planets"])
+    chart["house_signs"] = _int_keys(chart["house_signs"])
+    navamsa = dict(chart["navamsa"])
+    navamsa["nav_house_planets"] = _int_keys(navamsa["nav_house_planets"])
+    navamsa["nav_house_signs"] = _int_keys(navamsa["nav_house_signs"])
+    chart["navamsa"] = navamsa
+    return chart
+
+def matches_profile(profile, year, month, day, hour, minute, place):
+    """True when request birth data is the profile's own, so the snapshot can answer it."""
+    if profile is None or not has_birth_data(profile) or not profile.birth_place:
+        return False
+    dt = _birth_datetime(profile)
+    return ((int(year), int(month), int(day), int(hour), int(minute)) ==
+            (dt.year, dt.month, dt.day, dt.hour, dt.minute)
+            and str(place).strip().lower() == str(profile.birth_place).strip().lower())
+
+def natal_summary(snapshot):
+    """A few lines for the chat system prompt."""
+    lord, start, end = current_dasha(snapshot)
+    return (f"Ascendant: {snapshot.ascendant}\n\n"
+            f"Moon: {SIGNS[snapshot.moon_rashi]}, {NAKSHATRAS[snapshot.moon_nakshatra]} pada {snapshot.moon_pada}\n\n"
+            f"Current Mahadasha: {lord} ({start:%Y-%m} to {end:%Y-%m})")
+
+def own_kundali(profile, year, month, day, hour, minute, place):
+    """snapshot_kundali() when the requested birth data is the profile's own, else None."""
+    if not matches_profile(profile, year, month, day, hour, minute, place):
+        return None
+    snapshot = get_natal_snapshot(profile)
+    return snapshot_kundali(snapshot) if snapshot else None
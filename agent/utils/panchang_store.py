@@ -0,0 +1,159 @@
+# Stored daily panchang.
+# Sunrise/sunset, moonrise/moonset and everything derived from them only
+# depend on (date, place), so they are computed once per city and day into
+# DailyPanchang. The tithi/nakshatra/yoga/karana part is a few calc_ut
+# calls and stays live because it depends on the time of the request.
+# Rows for the busiest cities are filled ahead of time by
+# precompute_panchang(), run daily from `manage.py runapscheduler`. Only
+# those cities are stored at all: any other place is computed on the fly,
+# so ad-hoc lookups and year-long ranges can't grow the table.
+
+from datetime import date, datetime, timedelta
+import swisseph as swe
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from ..models import DailyPanchang, UserProfile
+from .geocoding import geocode_place_timezone
+from .panchang import get_day_panchang, get_panchang
+from .riseset import warm_rise_set
+
+PRECOMPUTE_DAYS = 7
+MAX_RANGE_DAYS = 366
+TOP_PROFILE_PLACES = 20
+STORED_LOCATIONS_KEY = "panchang:stored-locations"
+STORED_LOCATIONS_TIMEOUT = 60 * 60
+DEFAULT_CITIES = [
+    "Delhi, India", "Mumbai, India", "Kolkata, India", "Chennai, India",
+    "Bengaluru, India", "Hyderabad, India", "Ahmedabad, India", "Pune, India",
+    "Jaipur, India", "Lucknow, India", "Surat, India", "Varanasi, India",
+]
+
+def _location_key(lat, lon):
+    # ~1 km; rise/set times move by seconds over that distance
+    return round(float(lat), 2), round(float(lon), 2)
+
+def day_offset(tz, day):
+    """UTC offset in hours of a pytz zone on a given date (taken at local noon)."""
+    noon = tz.localize(datetime(day.year, day.month, day.day, 12))
+    return float(noon.utcoffset().total_seconds() / 3600)
+
+def get_day_data(day, lat, lon, tz_offset):
+    """
+    get_day_panchang() for a date and place, read from DailyPanchang when
+    present. Misses are computed live, and stored for the next request only
+    when the place is one of the precompute cities.
+    """
+    key_lat, key_lon = _location_key(lat, lon)
+    if (key_lat, key_lon) not in stored_locations():
+        return get_day_panchang(day.year, day.month, day.day, lat, lon, tz_offset)
+    row = DailyPanchang.objects.filter(
+        lat=key_lat, lon=key_lon, date=day, tz_offset=tz_offset
+    ).first()
+    if row:
+        return row.data
+    data = get_day_panchang(day.year, day.month, day.day, lat, lon, tz_offset)
+    DailyPanchang.objects.update_or_create(
+        lat=key_lat, lon=key_lon, date=day, tz_offset=tz_offset, defaults={"data": data}
+    )
+    return data
+
+def get_panchang_for_day(day, hour, minute, lat, lon, tz_offset):
+    """Same result as get_panchang(), with the date/place part from the table."""
+    day_data = get_day_data(day, lat, lon, tz_offset)
+    return get_panchang(day.year, day.month, day.day, hour, minute, lat, lon, tz_offset, day_data=day_data)
+
+def iter_panchang_range(start, end, lat, lon, tz):
+    """
+    Yield the panchang for every day from start to end (inclusive) at one
+    place, with the limbs taken at local sunrise as in a printed calendar.
+    Stored rows for the range are read in one query; rise/set events for
+    the missing days are computed in one warm_rise_set() batch first, and
+    the days are written back if the place is a precompute city.
+    """
+    swe.set_sid_mode(swe.SIDM_LAHIRI)
+    key_lat, key_lon = _location_key(lat, lon)
+    store = (key_lat, key_lon) in stored_locations()
+    rows = {}
+    if store:
+        rows = {
+            (row.date, row.tz_offset): row.data
+            for row in DailyPanchang.objects.filter(lat=key_lat, lon=key_lon, date__range=(start, end))
+        }
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    offsets = [day_offset(tz, day) for day in days]
+    missing = [(day, off) for day, off in zip(days, offsets) if (day, off) not in rows]
+    if missing:
+        # one extra day: the night choghadiya of the last day needs the next sunrise
+        last = missing[-1][0] + timedelta(days=1)
+        warm_rise_set([d for d, _ in missing] + [last], lat, lon,
+                      [o for _, o in missing] + [day_offset(tz, last)])
+
+    for day, tz_offset in zip(days, offsets):
+        data = rows.get((day, tz_offset))
+        if data is None:
+            data = get_day_panchang(day.year, day.month, day.day, lat, lon, tz_offset)
+            if store:
+                DailyPanchang.objects.update_or_create(
+                    lat=key_lat, lon=key_lon, date=day, tz_offset=tz_offset, defaults={"data": data}
+                )
+        h, mi = map(int, data["sunrise"].split(":"))
+        result = get_panchang(day.year, day.month, day.day, h, mi, lat, lon, tz_offset, day_data=data)
+        result["date"] = day.isoformat()
+        yield result
+
+def precompute_cities():
+    """Configured cities plus the most common birth places among profiles."""
+    cities = list(getattr(settings, "PANCHANG_PRECOMPUTE_CITIES", DEFAULT_CITIES))
+    top = (UserProfile.objects.exclude(birth_place__isnull=True).exclude(birth_place="")
+           .values("birth_place").annotate(n=Count("id")).order_by("-n")[:TOP_PROFILE_PLACES])
+    cities.extend(row["birth_place"] for row in top)
+    return cities
+
+def _city_locations(cities):
+    """(location key, lat, lon, tz) for each city that geocodes, once per location."""
+    seen = set()
+    for city in cities:
+        lat, lon, tz = geocode_place_timezone(city)
+        if lat is None or tz is None:
+            continue
+        key = _location_key(lat, lon)
+        if key in seen:
+            continue
+        seen.add(key)
+        yield key, lat, lon, tz
+
+def stored_locations():
+    """Location keys whose days are kept in DailyPanchang (the precompute cities)."""
+    locations = cache.get(STORED_LOCATIONS_KEY)
+    if locations is None:
+        locations = {key for key, _, _, _ in _city_locations(precompute_cities())}
+        cache.set(STORED_LOCATIONS_KEY, locations, STORED_LOCATIONS_TIMEOUT)
+    return locations
+
+def precompute_panchang(days=None, cities=None, start=None):
+    """
+    Fill DailyPanchang for `days` days from `start` (default today) for each
+    city, skipping rows that already exist. Rows older than yesterday are
+    dropped. Returns the number of rows written.
+    """
+    if days is None:
+        days = getattr(settings, "PANCHANG_PRECOMPUTE_DAYS", PRECOMPUTE_DAYS)
+    if cities is None:
+        cities = precompute_cities()
+        # The top profile places may have changed since stored_locations() was cached
+        cache.delete(STORED_LOCATIONS_KEY)
+    start = start or date.today()
+    DailyPanchang.objects.filter(date__lt=start - timedelta(days=1)).delete()
+
+    written = 0
+    for (key_lat, key_lon), lat, lon, tz in _city_locations(cities):
+        for i in range(days):
+            day = start + timedelta(days=i)
+            tz_offset = day_offset(tz, day)
+            if DailyPanchang.objects.filter(lat=key_lat, lon=key_lon, date=day, tz_offset=tz_offset).exists():
+                continue
+            data = get_day_panchang(day.year, day.month, day.day, lat, lon, tz_offset)
+            DailyPanchang.objects.create(lat=key_lat, lon=key_lon, date=day, tz_offset=tz_offset, data=data)
+            written += 1
+    return written
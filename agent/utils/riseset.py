@@ -0,0 +1,115 @@
+# Sun and Moon rise/set service.
+# Events are cached per (body, location rounded to ~1 km, local date, UTC
+# offset) in their own "riseset" cache, so sunrise-derived values
+# (choghadiya, rahu kaal, abhijit, ...) never repeat a rise_trans search.
+# The alias is sized for year-long warms (two entries per day); sharing the
+# 300-entry default cache would cull warmed days before they were read and
+# push out the kundali entries with them.
+# warm_rise_set() fills many days at once: approximate sunrise/sunset for
+# every day come from one vectorized NOAA pass, and each Swiss Ephemeris
+# search starts just before that estimate instead of at local midnight.
+
+from datetime import date, datetime, timedelta
+import numpy as np
+import swisseph as swe
+from django.core.cache import caches
+
+CACHE_ALIAS = "riseset"
+CACHE_PREFIX = "riseset:v1"
+CACHE_TIMEOUT = 60 * 60 * 24 * 400
+SEED_MARGIN_DAYS = 30 / 1440.0   # start searches 30 min before the estimate
+NOAA_ZENITH = 90.833
+
+def round_location(lat, lon):
+    return round(float(lat), 2), round(float(lon), 2)
+
+def _cache_key(body, lat, lon, day, tz_offset):
+    return f"{CACHE_PREFIX}:{body}:{lat}:{lon}:{day.isoformat()}:{tz_offset:g}"
+
+def _local_midnight_jd(day, tz_offset):
+    return swe.julday(day.year, day.month, day.day, 0.0 - tz_offset)
+
+def _search(body, lat, lon, rise_start, set_start):
+    geopos = (lon, lat, 0)
+    rise_jd = swe.rise_trans(rise_start, body, geopos=geopos, rsmi=swe.CALC_RISE)[1][0]
+    set_jd = swe.rise_trans(set_start, body, geopos=geopos, rsmi=swe.CALC_SET)[1][0]
+    return rise_jd, set_jd
+
+def noaa_sun_estimates(days, lat, lon, tz_offsets):
+    """
+    Approximate (sunrise, sunset) local hours for every date in `days`, as
+    two float arrays (NaN when the Sun does not rise/set). NOAA's short
+    algorithm, good to a few minutes away from the poles.
+    """
+    n = np.array([d.timetuple().tm_yday for d in days], dtype="f8")
+    tz = np.asarray(tz_offsets, dtype="f8")
+    lng_hour = lon / 15.0
+    out = []
+    for is_rise in (True, False):
+        t = n + ((6.0 if is_rise else 18.0) - lng_hour) / 24.0
+        m = 0.9856 * t - 3.289
+        l = (m + 1.916 * np.sin(np.radians(m)) + 0.020 * np.sin(np.radians(2 * m)) + 282.634) % 360.0
+        ra = np.degrees(np.arctan2(0.91764 * np.sin(np.radians(l)), np.cos(np.radians(l)))) % 360.0 / 15.0
+        sin_dec = 0.39782 * np.sin(np.radians(l))
+        cos_dec = np.cos(np.arcsin(sin_dec))
+        cos_h = (np.cos(np.radians(NOAA_ZENITH)) - np.sin(np.radians(lat)) * sin_dec) / (np.cos(np.radians(lat)) * cos_dec)
+        with np.errstate(invalid="ignore"):
+            h = np.degrees(np.arccos(cos_h)) / 15.0
+        if is_rise:
+            h = 24.0 - h
+        ut = (h + ra - 0.06571 * t - 6.622 - lng_hour) % 24.0
+        out.append((ut + tz) % 24.0)
+    return out[0], out[1]
+
+def rise_set(body, day, lat, lon, tz_offset=5.5):
+    """
+    (rise_jd, set_jd) in UT for swe.SUN or swe.MOON: the first rise and the
+    first set after local midnight of `day`.
+    """
+    lat, lon = round_location(lat, lon)
+    cache = caches[CACHE_ALIAS]
+    key = _cache_key(body, lat, lon, day, tz_offset)
+    events = cache.get(key)
+    if events is None:
+        start = _local_midnight_jd(day, tz_offset)
+        events = _search(body, lat, lon, start, start)
+        cache.set(key, events, CACHE_TIMEOUT)
+    return events
+
+def warm_rise_set(days, lat, lon, tz_offsets):
+    """
+    Compute and cache Sun and Moon events for every date in `days` (with the
+    matching UTC offsets) that is not cached yet. Sun searches are seeded
+    from noaa_sun_estimates(). Returns the number of days computed.
+    """
+    lat, lon = round_location(lat, lon)
+    cache = caches[CACHE_ALIAS]
+    todo = []
+    for day, tz_offset in zip(days, tz_offsets):
+        keys = [_cache_key(body, lat, lon, day, tz_offset) for body in (swe.SUN, swe.MOON)]
+        if len(cache.get_many(keys)) < 2:
+            todo.append((day, tz_offset, keys))
+    if not todo:
+        return 0
+
+    rise_est, set_est = noaa_sun_estimates([t[0] for t in todo], lat, lon, [t[1] for t in todo])
+    values = {}
+    for (day, tz_offset, (sun_key, moon_key)), rise_h, set_h in zip(todo, rise_est, set_est):
+        midnight = _local_midnight_jd(day, tz_offset)
+        rise_start = midnight if np.isnan(rise_h) else max(midnight, midnight + rise_h / 24.0 - SEED_MARGIN_DAYS)
+        set_start = midnight if np.isnan(set_h) else max(midnight, midnight + set_h / 24.0 - SEED_MARGIN_DAYS)
+        values[sun_key] = _search(swe.SUN, lat, lon, rise_start, set_start)
+        values[moon_key] = _search(swe.MOON, lat, lon, midnight, midnight)
+    cache.set_many(values, CACHE_TIMEOUT)
+    return len(todo)
+
+def warm_year(year, lat, lon, tz):
+    """warm_rise_set() for every day of `year`; tz is a pytz zone."""
+    day = date(year, 1, 1)
+    days, offsets = [], []
+    while day.year == year:
+        noon = tz.localize(datetime(day.year, day.month, day.day, 12))
+        days.append(day)
+        offsets.append(float(noon.utcoffset().total_seconds() / 3600))
+        day += timedelta(days=1)
+    return warm_rise_set(days, lat, lon, offsets)
@@ -0,0 +1,107 @@
+# Incremental speech segmentation for voice chat.
+# The browser streams raw 48 kHz 16-bit mono PCM in arbitrary frame sizes.
+# SpeechSegmenter keeps a rolling per-connection buffer, downsamples to
+# Whisper's 16 kHz float32 and runs an energy VAD over 30 ms frames (an
+# adaptive noise floor, so a quiet room and a noisy one both work). It
+# reports "partial" audio about once a second while someone is speaking and
+# a "final" segment once they pause, so only completed utterances are
+# transcribed in full and words are never cut at frame boundaries. Samples
+# go to faster-whisper as NumPy arrays: no pydub, no WAV round-trip.
+
+import numpy as np
+
+INPUT_RATE = 48000
+WHISPER_RATE = 16000
+DECIMATION = INPUT_RATE // WHISPER_RATE
+FRAME = WHISPER_RATE * 30 // 1000          # 30 ms VAD frame
+
+MIN_RMS = 0.01          # ~ -40 dBFS: quieter frames are never speech
+SPEECH_RATIO = 3.0      # voiced when RMS exceeds noise floor x ratio
+FLOOR_ALPHA = 0.05      # noise floor EMA weight for unvoiced frames
+START_FRAMES = 3        # 90 ms of voice opens a segment
+END_FRAMES = 20         # 600 ms of silence closes it
+PRE_ROLL_FRAMES = 10    # 300 ms kept before the segment opened
+TAIL_FRAMES = 7         # 210 ms of the closing silence kept
+PARTIAL_FRAMES = 33     # ~1 s between partial transcripts
+MAX_SEGMENT_FRAMES = 20 * 1000 // 30       # force a final after 20 s
+
+def pcm16_to_float(pcm, rate=INPUT_RATE):
+    """int16 PCM bytes -> float32 samples in [-1, 1) at 16 kHz."""
+    samples = np.frombuffer(pcm, dtype="<i2")
+    factor = rate // WHISPER_RATE
+    if factor > 1:
+        n = len(samples) - len(samples) % factor
+        # Averaging each group of samples is the low-pass before decimating
+        samples = samples[:n].reshape(-1, factor).mean(axis=1, dtype="f4")
+    return np.asarray(samples, dtype="f4") / 32768.0
+
+class SpeechSegmenter:
+
+    def __init__(self):
+        self.floor = MIN_RMS / SPEECH_RATIO
+        self._bytes = b""            # trailing bytes short of one input sample group
+        self._samples = np.zeros(0, dtype="f4")   # 16 kHz samples short of a frame
+        self.pre_roll = []
+        self.segment = []
+        self.voiced_run = 0
+        self.silent_run = 0
+        self.in_speech = False
+        self.since_partial = 0
+
+    def _frames(self, pcm):
+        data = self._bytes + pcm if self._bytes else pcm
+        group = 2 * DECIMATION
+        cut = len(data) - len(data) % group
+        self._bytes = data[cut:]
+        samples = np.concatenate([self._samples, pcm16_to_float(memoryview(data)[:cut])])
+        n = len(samples) - len(samples) % FRAME
+        self._samples = samples[n:]
+        return samples[:n].reshape(-1, FRAME)
+
+    def _emit_final(self, events):
+        keep = len(self.segment) - max(0, self.silent_run - TAIL_FRAMES)
+        audio = np.concatenate(self.segment[:keep])
+        events.append(("final", audio))
+        self.segment, self.pre_roll = [], []
+        self.in_speech = False
+        self.voiced_run = self.silent_run = self.since_partial = 0
+
+    def feed(self, pcm):
+        """
+        Add PCM bytes; returns a list of ("partial" | "final", float32 audio)
+        events. Partials carry the whole utterance so far.
+        """
+        events = []
+        frames = self._frames(pcm)
+        if not len(frames):
+            return events
+        rms = np.sqrt(np.mean(np.square(frames), axis=1))
+        for frame, level in zip(frames, rms):
+            voiced = level > max(MIN_RMS, self.floor * SPEECH_RATIO)
+            if not voiced:
+                self.floor += FLOOR_ALPHA * (level - self.floor)
+            if not self.in_speech:
+                self.pre_roll.append(frame)
+                self.voiced_run = self.voiced_run + 1 if voiced else 0
+                if self.voiced_run >= START_FRAMES:
+                    self.in_speech = True
+                    self.segment = self.pre_roll[-(PRE_ROLL_FRAMES + START_FRAMES):]
+                    self.silent_run = self.since_partial = 0
+                del self.pre_roll[:-(PRE_ROLL_FRAMES + START_FRAMES)]
+                continue
+            self.segment.append(frame)
+            self.silent_run = 0 if voiced else self.silent_run + 1
+            self.since_partial += 1
+            if self.silent_run >= END_FRAMES or len(self.segment) >= MAX_SEGMENT_FRAMES:
+                self._emit_final(events)
+            elif self.since_partial >= PARTIAL_FRAMES and self.silent_run == 0:
+                self.since_partial = 0
+                events.append(("partial", np.concatenate(self.segment)))
+        return events
+
+    def flush(self):
+        """The open segment as a final event (e.g. the client stopped recording)."""
+        events = []
+        if self.in_speech and self.segment:
+            self._emit_final(events)
+        return events
@@ -0,0 +1,47 @@
+# Server-sent events for streamed chat replies.
+# Deltas go out as `data: {"delta": ...}` while the model generates them and
+# the full reply closes the stream as an `event: done`. The session is saved
+# by hand at the end: SessionMiddleware has already run by the time a
+# streaming body is iterated.
+
+import json
+from django.http import StreamingHttpResponse
+from .llm import stream_chat
+
+def sse_event(data, event=None):
+    head = f"event: {event}\n" if event else ""
+    return f"{head}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def wants_stream(request, data=None):
+    """True for ?stream=1 or a truthy "stream" field in the request body."""
+    if request.GET.get("stream") in ("1", "true"):
+        return True
+    value = (data or {}).get("stream")
+    return value is True or str(value).lower() in ("1", "true")
+
+def chat_event_stream(request, chat_history, keep=None):
+    """
+    SSE lines for the reply to chat_history[-20:]; on completion the reply is
+    appended and the history (last `keep` messages if given) stored in the session.
+    """
+    reply = ""
+    try:
+        for delta in stream_chat(chat_history[-20:]):
+            reply += delta
+            yield sse_event({"delta": delta})
+    except Exception as e:
+        print(f"Chat stream failed: {e}")
+        yield sse_event({"error": "Unable to process request."}, event="error")
+        return
+    reply = reply.strip()
+    chat_history.append({"role": "assistant", "content": reply})
+    request.session["chat_history"] = chat_history[-keep:] if keep else chat_history
+    request.session.save()
+    yield sse_event({"reply": reply}, event="done")
+
+def chat_stream_response(request, chat_history, keep=None):
+    response = StreamingHttpResponse(chat_event_stream(request, chat_history, keep),
+                                     content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -7,13 +7,7 @@ from .. import models
 # genai.configure(api_key=AI_API_KEY)
 # model = genai.GenerativeModel("gemini-2.5-flash")
 
-from openai import AzureOpenAI
-endpoint = os.getenv("ENDPOINT_URL", "https://jivihireopenai.openai.azure.com/")
-client = AzureOpenAI(
-        azure_endpoint=endpoint,
-        api_key=os.environ['OPENAI_API_KEY'],
-        api_version="2024-05-01-preview",
-    )
+from .llm import ask
 
 def get_ai_interpretation(spread, spread_type="3-card"):
     prompt = f"""
@@ -28,12 +22,7 @@ def get_ai_interpretation(spread, spread_type="3-card"):
     """
     # response = model.generate_content(prompt)
     # return response.text.strip()
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",  # or "gpt-4", "gpt-3.5-turbo"
-        messages= [{"role": "user", "content": prompt}],
-        temperature=0.7
-    )
-    result = response.choices[0].message.content.strip()
+    result = ask(prompt)
     return result
 
 TAROT_CARDS = [
@@ -0,0 +1,120 @@
+# Process-wide timezone resolver.
+# One TimezoneFinder per process, fronted by a coarse lat/lon grid: cells
+# that lie entirely inside one zone answer from the grid, only border cells
+# fall through to the polygon test. A cell only counts as interior when its
+# samples and those of all eight neighbours agree, so a boundary or an
+# enclave slipping between one cell's samples still marks it as border.
+# The grid is filled lazily per cell, or loaded from agent/data/tz_grid.json
+# (see `manage.py build_tz_grid`).
+
+import json
+import os
+import threading
+from array import array
+from functools import lru_cache
+from timezonefinderL import TimezoneFinder
+
+GRID_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "tz_grid.json")
+CELL_DEG = 1.0
+SAMPLES = 3     # samples per cell edge (3 -> corners, edge midpoints, centre)
+
+_UNKNOWN = -2
+_BORDER = -1
+
+@lru_cache(maxsize=1)
+def get_timezone_finder():
+    return TimezoneFinder()
+
+class TimezoneGrid:
+    def __init__(self, cell_deg=CELL_DEG, names=None, cells=None):
+        self.cell_deg = cell_deg
+        self.rows = int(round(180 / cell_deg))
+        self.cols = int(round(360 / cell_deg))
+        self.names = list(names or [])
+        self._index = {n: i for i, n in enumerate(self.names)}
+        if cells is None:
+            self.cells = array("h", [_UNKNOWN]) * (self.rows * self.cols)
+        else:
+            self.cells = array("h", cells)
+        # Per-cell sample results, shared by neighbouring cells' classification
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def _cell(self, lat, lon):
+        r = min(max(int((lat + 90) // self.cell_deg), 0), self.rows - 1)
+        c = min(max(int((lon + 180) // self.cell_deg), 0), self.cols - 1)
+        return r * self.cols + c
+
+    def _sample(self, r, c):
+        """Zone name if every sample in cell (r, c) agrees, else None."""
+        c %= self.cols
+        r = min(max(r, 0), self.rows - 1)
+        key = r * self.cols + c
+        if key in self._samples:
+            return self._samples[key]
+        tf = get_timezone_finder()
+        name = None
+        for i in range(SAMPLES * SAMPLES):
+            lat = -90 + (r + i // SAMPLES / (SAMPLES - 1)) * self.cell_deg
+            lat = min(max(lat, -89.999), 89.999)
+            lon = -180 + (c + i % SAMPLES / (SAMPLES - 1)) * self.cell_deg
+            lon = min(max(lon, -179.999), 179.999)
+            found = tf.timezone_at(lng=lon, lat=lat)
+            if not found or (name and found != name):
+                name = None
+                break
+            name = found
+        self._samples[key] = name
+        return name
+
+    def _classify(self, cell):
+        """Zone index if the cell and its eight neighbours sample as one zone, else _BORDER."""
+        r, c = divmod(cell, self.cols)
+        name = self._sample(r, c)
+        if name is None:
+            return _BORDER
+        for dr in (-1, 0, 1):
+            for dc in (-1, 0, 1):
+                if (dr or dc) and self._sample(r + dr, c + dc) != name:
+                    return _BORDER
+        with self._lock:
+            if name not in self._index:
+                self._index[name] = len(self.names)
+                self.names.append(name)
+            return self._index[name]
+
+    def timezone_at(self, lat, lon):
+        cell = self._cell(lat, lon)
+        value = self.cells[cell]
+        if value == _UNKNOWN:
+            value = self._classify(cell)
+            self.cells[cell] = value
+        if value >= 0:
+            return self.names[value]
+        return get_timezone_finder().timezone_at(lng=lon, lat=lat)
+
+    def fill(self):
+        for cell in range(len(self.cells)):
+            if self.cells[cell] == _UNKNOWN:
+                self.cells[cell] = self._classify(cell)
+        self._samples.clear()
+
+    def save(self, path=GRID_PATH):
+        with open(path, "w") as f:
+            json.dump({"cell_deg": self.cell_deg, "names": self.names, "cells": self.cells.tolist()}, f)
+
+    @classmethod
+    def load(cls, path=GRID_PATH):
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["cell_deg"], data["names"], data["cells"])
+
+@lru_cache(maxsize=1)
+def get_timezone_grid():
+    if os.path.exists(GRID_PATH):
+        return TimezoneGrid.load(GRID_PATH)
+    return TimezoneGrid()
+
+def timezone_at(lat, lon):
+    """IANA timezone name for a point, or None (e.g. open ocean)."""
+    return get_timezone_grid().timezone_at(float(lat), float(lon))
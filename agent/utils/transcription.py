@@ -0,0 +1,101 @@
+# Bounded transcription worker pool.
+# Whisper runs in CTranslate2, which releases the GIL, so a small thread
+# pool keeps several voice sessions transcribing in parallel without
+# touching the event loop. At most TRANSCRIBE_MAX_PENDING jobs may be
+# queued or running; beyond that submit() raises TranscriptionBusy and the
+# caller backs off instead of piling up work. Queue depth, wait and run
+# latencies are kept for transcription_metrics().
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from django.conf import settings
+
+LATENCY_WINDOW = 200   # recent jobs used for the latency percentiles
+
+class TranscriptionBusy(Exception):
+    """The pool already holds its maximum number of pending jobs."""
+
+def _percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+class TranscriptionPool:
+
+    def __init__(self, workers, max_pending):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="transcribe")
+        self.workers = workers
+        self.max_pending = max_pending
+        self.lock = threading.Lock()
+        self.pending = 0     # queued + running
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.waits = deque(maxlen=LATENCY_WINDOW)
+        self.runs = deque(maxlen=LATENCY_WINDOW)
+
+    def _job(self, queued_at, fn, args):
+        started = time.monotonic()
+        with self.lock:
+            self.running += 1
+            self.waits.append(started - queued_at)
+        ok = False
+        try:
+            result = fn(*args)
+            ok = True
+            return result
+        finally:
+            with self.lock:
+                self.running -= 1
+                self.pending -= 1
+                self.runs.append(time.monotonic() - started)
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+
+    def submit(self, fn, *args):
+        """Queue fn(*args); returns a concurrent Future or raises TranscriptionBusy."""
+        with self.lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise TranscriptionBusy()
+            self.pending += 1
+        return self.executor.submit(self._job, time.monotonic(), fn, args)
+
+    async def run(self, fn, *args):
+        """submit() awaited from the event loop."""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def metrics(self):
+        with self.lock:
+            waits, runs = list(self.waits), list(self.runs)
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "queue_depth": self.pending - self.running,
+                "running": self.running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "wait_p50": _percentile(waits, 0.5),
+                "wait_p95": _percentile(waits, 0.95),
+                "run_p50": _percentile(runs, 0.5),
+                "run_p95": _percentile(runs, 0.95),
+            }
+
+@lru_cache(maxsize=1)
+def get_transcription_pool():
+    workers = getattr(settings, "TRANSCRIBE_WORKERS", None) or max(1, (os.cpu_count() or 2) // 2)
+    max_pending = getattr(settings, "TRANSCRIBE_MAX_PENDING", None) or workers * 4
+    return TranscriptionPool(workers, max_pending)
+
+def transcription_metrics():
+    return get_transcription_pool().metrics()
@@ -0,0 +1,56 @@
+# Shared Whisper model registry.
+# Models are loaded on first use, once per process, and keyed by
+# (size, device, compute_type), so the chat views and the voice consumer
+# share a copy instead of each loading their own at import time. On CPU
+# the default compute type is int8, which is about a quarter of the float32
+# memory with little loss in accuracy. warm() starts a load in the
+# background so the first transcription doesn't pay for it. faster_whisper
+# itself is only imported then, keeping it out of manage.py startup.
+
+import threading
+from django.conf import settings
+from .transcription import get_transcription_pool
+
+CHAT_MODEL_SIZE = "base"
+VOICE_MODEL_SIZE = "small"
+
+_models = {}
+_lock = threading.Lock()
+_key_locks = {}
+
+def _device():
+    return getattr(settings, "WHISPER_DEVICE", "cpu")
+
+def default_compute_type(device):
+    return getattr(settings, "WHISPER_COMPUTE_TYPE", None) or ("int8" if device == "cpu" else "float16")
+
+def get_whisper_model(size=CHAT_MODEL_SIZE, device=None, compute_type=None):
+    """The process-wide WhisperModel for (size, device, compute_type), loading it if needed."""
+    device = device or _device()
+    key = (size, device, compute_type or default_compute_type(device))
+    model = _models.get(key)
+    if model is not None:
+        return model
+    with _lock:
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+    # Per-key lock: loading one size doesn't hold up callers of another
+    with key_lock:
+        model = _models.get(key)
+        if model is None:
+            from faster_whisper import WhisperModel
+            model = _models[key] = WhisperModel(
+                size, device=device, compute_type=key[2],
+                num_workers=get_transcription_pool().workers,
+            )
+    return model
+
+def warm(size=CHAT_MODEL_SIZE, device=None, compute_type=None):
+    """Load a model in a background thread unless it is already loaded."""
+    device = device or _device()
+    if (size, device, compute_type or default_compute_type(device)) in _models:
+        return
+    threading.Thread(target=get_whisper_model, args=(size, device, compute_type),
+                     name=f"whisper-warm-{size}", daemon=True).start()
+
+def loaded_models():
+    return sorted(_models)
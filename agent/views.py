@@ -1,5 +1,5 @@
 from django.shortcuts import render, redirect
-from django.http import JsonResponse
+from django.http import JsonResponse,HttpResponse,Http404
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
 # from django.conf import settings
@@ -11,35 +11,30 @@ from .models import UserProfile,TarotCard
 # from google.generativeai import GenerativeModel, configure
 import json,random,base64,os,io
 from .forms import CustomSignupForm,UserProfileForm
-from geopy.geocoders import Nominatim
 # from tzwhere import tzwhere
-from timezonefinderL import TimezoneFinder
-import pytz
 from dotenv import load_dotenv
 from datetime import date,datetime
-from .utils.kundali import get_kundali_chart
+from .utils.kundali import get_kundali_chart,kundali_chart_urls
 from .utils.compatibility import compatibility_report
 from .utils.kundali_matching import perform_kundali_matching
-from .utils.chinese_zodiac import generate_bazi
-from .utils.panchang import get_panchang
+from .utils.chinese_zodiac import generate_bazi,element_chart_url
+from .utils.chart_cache import get_chart
+from .utils.panchang_store import get_panchang_for_day
+from .utils.geocoding import geocode_place_timezone
+from .utils.natal import get_natal_snapshot,natal_summary,own_kundali,offset_at
+from .utils.gazetteer import get_gazetteer,display_name
 from .utils.tarot import get_ai_interpretation,load_cards
+from .utils.whisper_models import get_whisper_model,CHAT_MODEL_SIZE
+from .utils.audio_io import load_audio
 
 load_dotenv()
 # from gtts import gTTS
-from faster_whisper import WhisperModel
-
-whisperModel = WhisperModel("base")
 # AI_API_KEY = os.getenv('AI_API_KEY')
 # configure(api_key=AI_API_KEY)
 # MODEL = GenerativeModel("gemini-2.5-flash")
 
-from openai import AzureOpenAI
-endpoint = os.getenv("ENDPOINT_URL", "https://jivihireopenai.openai.azure.com/")
-client = AzureOpenAI(
-        azure_endpoint=endpoint,
-        api_key=os.environ['OPENAI_API_KEY'],
-        api_version="2024-05-01-preview",
-    )
+from .utils.llm import complete
+from .utils.sse import chat_stream_response,wants_stream
 
 SYSTEM_PROMPT_TEMPLATE = (
     """Role & Tone:
@@ -102,21 +97,6 @@ Today’s Date: {today}
 This astrology guidance system has been created and built by JMS Advisory, bringing ancient wisdom into modern life."""
 )
 
-def geocode_place_timezone(place_name: str):
-    try:
-        geolocator = Nominatim(user_agent="astro_ai_app",timeout=10)
-        location = geolocator.geocode(place_name)
-        if location:
-            lat,lon = float(location.latitude),float(location.longitude)
-            tf = TimezoneFinder()
-            timezone_str = tf.timezone_at(lng=77.2090, lat=28.6139)
-            if timezone_str:
-                tz = pytz.timezone(timezone_str)
-                return lat, lon, tz
-    except Exception as e:
-        print("Geocoding error:", e)
-        return None, None,None
-
 @csrf_exempt
 @login_required
 def chat_api(request):
@@ -126,12 +106,12 @@ def chat_api(request):
     try:
         message = None
         is_voice = False
+        data = request.POST
         # Handle audio input if present (multipart/form-data)
         if 'audio' in request.FILES:
             is_voice = True
             audio_file = request.FILES['audio']
-            audio_content = audio_file.read()
-            segments, info = whisperModel.transcribe(io.BytesIO(audio_content))
+            segments, info = get_whisper_model(CHAT_MODEL_SIZE).transcribe(load_audio(audio_file))
             try:
                 message = " ".join([seg.text.strip() for seg in segments])
             except Exception as e:
@@ -159,6 +139,9 @@ def chat_api(request):
             today=date.today(),
             name=profile.name
         )
+        snapshot = get_natal_snapshot(profile)
+        if snapshot:
+            system_prompt += "\n\nChart (precomputed):\n\n" + natal_summary(snapshot)
         # Get or initialize chat history
         chat_history = request.session.get("chat_history", [])
         if not chat_history:
@@ -171,12 +154,9 @@ def chat_api(request):
             chat_history = chat_history[-20:]
             chat_history.insert(0,{"role":"system","content":system_prompt})
             
-        response = client.chat.completions.create(
-            model="gpt-4o-mini", 
-            messages=chat_history[-20:],  
-            temperature=0.7
-        )
-        reply = response.choices[0].message.content.strip()
+        if wants_stream(request, data):
+            return chat_stream_response(request, chat_history)
+        reply = complete(chat_history[-20:])
         chat_history.append({"role": "assistant", "content": reply})
         
         # Store only the last 20 messages in session
@@ -260,7 +240,7 @@ def panchang_view(request):
         h = datetime.now().hour
         mi = datetime.now().minute
 
-        result = get_panchang(y, m, d, h, mi, lat, lon, offset_tz)
+        result = get_panchang_for_day(date(y, m, d), h, mi, lat, lon, offset_tz)
     return render(request, "panchang.html", {"result": result})
 
 @csrf_exempt
@@ -275,10 +255,12 @@ def kundali(request):
             minute = int(request.POST.get("minute"))
             second = int(request.POST.get('second'))
             place = str(request.POST.get('place'))
-            lat,lon,tz = geocode_place_timezone(place)
-            now = datetime.now(tz)
-            offset_tz = float(now.utcoffset().total_seconds() / 3600)
-            result = get_kundali_chart(year,month,day,hour,minute,lat,lon,offset_tz)
+            result = own_kundali(request.user.userprofile, year, month, day, hour, minute, place)
+            if result is None:
+                lat,lon,tz = geocode_place_timezone(place)
+                offset_tz = offset_at(tz, datetime(year, month, day, hour, minute))
+                result = get_kundali_chart(year,month,day,hour,minute,lat,lon,offset_tz,render=False)
+            result = kundali_chart_urls(result, fmt="svg")
         except Exception as e:
             return render(request,'kundali_result.html',{"error":"Unable to get kundali."})
         return render(request,'kundali_result.html',result)
@@ -335,10 +317,10 @@ def bazi_view(request):
         day = int(request.POST.get("day"))
         hour = int(request.POST.get("hour"))
 
-        bazi, chart, day_master, master_info,element_percentages = generate_bazi(year, month, day, hour)
+        bazi, chart, day_master, master_info,element_percentages = generate_bazi(year, month, day, hour, render=False)
         return render(request, "bazi_result.html", {
             "bazi": bazi,
-            "chart": chart,
+            "chart_url": element_chart_url(element_percentages),
             "day_master": day_master,
             "master_info": master_info,
             "element_percentages":element_percentages,
@@ -351,6 +333,29 @@ def bazi_view(request):
         else: y,m,d,hour = "","","",""
         return render(request, "bazi_form.html",{"hour":hour,"year":y,"month":m,"day":d})
     
+def chart_image(request, digest):
+    """Serves a content-addressed chart; the digest doubles as a strong ETag."""
+    etag = f'"{digest}"'
+    if request.headers.get("If-None-Match") in (etag, "*"):
+        response = HttpResponse(status=304)
+    else:
+        found = get_chart(digest)
+        if found is None:
+            raise Http404("Chart not found")
+        mime, content = found
+        response = HttpResponse(content, content_type=mime)
+    response["ETag"] = etag
+    response["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+def places_autocomplete(request):
+    query = request.GET.get("q", "").strip()
+    places = get_gazetteer().search(query, limit=8) if len(query) >= 2 else []
+    return JsonResponse({"places": [
+        {"name": p.name, "display": display_name(p), "lat": p.lat, "lon": p.lon, "tz": p.tz}
+        for p in places
+    ]})
+
 def tarot_page(request):
     return render(request, "tarot_page.html")
 
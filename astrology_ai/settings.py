@@ -134,7 +134,24 @@ CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         'LOCATION': 'astrology-ai-cache',
-    }
+    },
+    # Content-addressed chart images (agent/utils/chart_cache.py), on disk so
+    # every worker can serve a URL handed out by another one; least recently
+    # used images are evicted first
+    'charts': {
+        'BACKEND': 'agent.utils.chart_cache.LRUFileBasedCache',
+        'LOCATION': BASE_DIR / 'chart_cache',
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+    # Sun/Moon rise and set events (agent/utils/riseset.py): two small
+    # entries per place and day, so a year-long panchang range fits many
+    # times over
+    'riseset': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'astrology-ai-riseset',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
 }
 
 ASGI_APPLICATION = 'astrology_ai.asgi.application'
@@ -158,3 +175,51 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # APPEND_SLASH=False
 CORS_ALLOW_ALL_ORIGINS = True
+
+# Daily panchang precompute (agent/utils/panchang_store.py, run by
+# `manage.py runapscheduler`); the most common profile birth places are added
+PANCHANG_PRECOMPUTE_DAYS = 7
+PANCHANG_PRECOMPUTE_CITIES = [
+    "Delhi, India", "Mumbai, India", "Kolkata, India", "Chennai, India",
+    "Bengaluru, India", "Hyderabad, India", "Ahmedabad, India", "Pune, India",
+    "Jaipur, India", "Lucknow, India", "Surat, India", "Varanasi, India",
+]
+
+# Process pool size for /api/kundali-matching/batch/ (None -> CPU count)
+BATCH_MATCH_WORKERS = None
+
+# Shared LLM gateway (agent/utils/llm.py): pooled connections to Azure
+# OpenAI, per-call timeout in seconds and at most LLM_MAX_CONCURRENCY
+# completions in flight per process
+LLM_TIMEOUT = 60.0
+LLM_CONNECT_TIMEOUT = 5.0
+LLM_MAX_RETRIES = 2
+LLM_MAX_CONCURRENCY = 8
+LLM_MAX_CONNECTIONS = 20
+LLM_MAX_KEEPALIVE = 10
+
+# Voice transcription pool (agent/utils/transcription.py): worker threads
+# (None -> half the CPUs) and jobs queued or running before new audio is
+# turned away (None -> 4 per worker)
+TRANSCRIBE_WORKERS = None
+TRANSCRIBE_MAX_PENDING = None
+
+# Whisper models (agent/utils/whisper_models.py), loaded lazily per process;
+# compute type None -> int8 on CPU, float16 on GPU
+WHISPER_DEVICE = "cpu"
+WHISPER_COMPUTE_TYPE = None
+
+# Uploads above this are streamed to a temporary file; audio_io.load_audio
+# memory-maps those instead of reading them in (Django's default, 2.5 MB)
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2621440
+
+# Background jobs (agent/utils/jobs.py, run by `manage.py runjobs`). The
+# completion push over ws/jobs/ needs a channel layer shared between the
+# workers and the ASGI server (e.g. channels_redis); with the in-memory
+# layer clients fall back to polling /api/jobs/<id>/
+JOB_WORKERS = 2
+JOB_POLL_INTERVAL = 1.0
+
+# Daily horoscopes (agent/utils/horoscope.py): all 12 signs are generated
+# shortly after midnight (TIME_ZONE) for each locale by `runapscheduler`
+HOROSCOPE_LOCALES = ["en"]